@@ -0,0 +1,176 @@
+# benchmarks/bench.py
+"""Benchmark skalowania Scheduler.generate na syntetycznych grafikach.
+
+Przykłady:
+    python benchmarks/bench.py --out benchmarks/baseline.json
+    python benchmarks/bench.py --compare benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler.scheduler import Scheduler  # noqa: E402
+from scheduler.state import ScheduleState  # noqa: E402
+from scheduler.utils import month_days  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+# Zwykły miesiąc, miesiące z dużą liczbą świąt (kwiecień/maj) i grudzień
+DEFAULT_MONTHS = ("2026-02", "2026-04", "2026-05", "2026-12")
+DEFAULT_LEAVE = (0.0, 0.2)
+
+# Różnice poniżej tego progu (s) traktujemy jako szum pomiarowy
+MIN_ABS_DIFF = 0.005
+
+
+def synthetic_config(n_employees, year, month, leave_density, seed=0):
+    """Config w formacie config.json: n pracowników, losowe statystyki i urlopy.
+
+    leave_density to odsetek pracowników z jednym blokiem urlopu (3-7 dni).
+    """
+    rng = random.Random(seed)
+    employees = [f"P{i:05d}" for i in range(n_employees)]
+    initial_stats = {e: {"saturdays": rng.randint(0, 20), "sundays": rng.randint(0, 20),
+                         "holidays": rng.randint(0, 12)} for e in employees}
+    ndays = len(month_days(year, month))
+    leaves = {}
+    for e in rng.sample(employees, int(round(n_employees * leave_density))):
+        length = rng.randint(3, 7)
+        first = rng.randint(1, ndays - length + 1)
+        leaves[e] = list(range(first, first + length))
+    last_weekend_workers = rng.sample(employees, min(2, n_employees))
+    return {"employees": employees, "initial_stats": initial_stats,
+            "last_weekend_workers": last_weekend_workers, "leaves": leaves}
+
+
+def run_case(n_employees, year, month, leave_density, repeat=1, seed=1, xlsx=True):
+    """Najlepszy (minimalny) czas każdej fazy z `repeat` powtórzeń."""
+    cfg = synthetic_config(n_employees, year, month, leave_density)
+    best = {}
+    for _ in range(repeat):
+        sched = Scheduler(seed=seed)
+        state = ScheduleState.initial(date(year, month, 1), cfg["initial_stats"], cfg["last_weekend_workers"])
+        report = {}
+        t0 = time.perf_counter()
+        schedule, summary, holidays, _ = sched.generate_month(year, month, state, cfg["employees"], cfg["leaves"],
+                                                              report=report)
+        timings = dict(report.get("phases", {}))
+        timings["generate"] = time.perf_counter() - t0
+
+        if xlsx:
+            with tempfile.TemporaryDirectory() as tmp:
+                t0 = time.perf_counter()
+                sched.save_xlsx(schedule, summary, holidays, year, month, os.path.join(tmp, "bench.xlsx"))
+                timings["save_xlsx"] = time.perf_counter() - t0
+
+        for k, v in timings.items():
+            best[k] = min(best.get(k, v), v)
+    return {k: round(v, 6) for k, v in best.items()}
+
+
+def calibrate(repeat=10, loops=200_000):
+    """Najlepszy czas stałej pętli w czystym Pythonie - miara szybkości maszyny.
+
+    Porównanie z baseline z innej maszyny skaluje czasy stosunkiem kalibracji obu pomiarów.
+    """
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        acc = 0
+        for i in range(loops):
+            acc += i * i % 7
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return round(best, 6)
+
+
+def case_name(n, year, month, leave):
+    return f"n={n} {year}-{month:02d} leave={leave:g}"
+
+
+def run_suite(sizes, months, leave_densities, repeat, xlsx):
+    results = {}
+    for n in sizes:
+        for ym in months:
+            year, month = (int(x) for x in ym.split("-"))
+            for leave in leave_densities:
+                name = case_name(n, year, month, leave)
+                results[name] = run_case(n, year, month, leave, repeat=repeat, xlsx=xlsx)
+                print(f"{name:<32} " + " ".join(f"{k}={v:.4f}" for k, v in results[name].items()), flush=True)
+    return results
+
+
+def compare(current, baseline, tolerance, scale=1.0):
+    """Lista regresji: (przypadek, faza, baseline, teraz) gdy teraz > baseline * scale * (1 + tolerance)."""
+    regressions = []
+    for name, phases in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, now in phases.items():
+            was = base.get(key)
+            if was is None:
+                continue
+            was *= scale
+            if now > was * (1 + tolerance) and now - was > MIN_ABS_DIFF:
+                regressions.append((name, key, was, now))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark skalowania generatora grafiku")
+    parser.add_argument("--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)),
+                        help="liczby pracowników, np. 10,100,1000,5000")
+    parser.add_argument("--months", type=str, default=",".join(DEFAULT_MONTHS),
+                        help="miesiące YYYY-MM oddzielone przecinkami")
+    parser.add_argument("--leave", type=str, default=",".join(map(str, DEFAULT_LEAVE)),
+                        help="odsetki pracowników z urlopem, np. 0,0.2")
+    parser.add_argument("--repeat", type=int, default=1, help="liczba powtórzeń (bierzemy minimum)")
+    parser.add_argument("--no-xlsx", action="store_true", help="pomiń pomiar save_xlsx")
+    parser.add_argument("--out", type=str, default=None, help="zapisz wyniki jako baseline JSON")
+    parser.add_argument("--compare", type=str, default=None, help="porównaj z baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="dopuszczalny wzrost czasu względem baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    months = [x for x in args.months.split(",") if x]
+    leaves = [float(x) for x in args.leave.split(",") if x]
+    results = run_suite(sizes, months, leaves, args.repeat, not args.no_xlsx)
+    calibration = calibrate()
+    print(f"Kalibracja: {calibration:.4f}s")
+
+    if args.out:
+        payload = {
+            "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                     "platform": platform.platform(), "repeat": args.repeat,
+                     "calibration": calibration},
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"Zapisano baseline: {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_cal = baseline["meta"].get("calibration")
+        scale = calibration / base_cal if base_cal else 1.0
+        regressions = compare(results, baseline["results"], args.tolerance, scale)
+        for name, key, was, now in regressions:
+            print(f"❌ REGRESJA {name} {key}: {was:.4f}s -> {now:.4f}s ({now / was - 1:+.0%})")
+        if regressions:
+            return 1
+        print("Brak regresji względem baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,128 @@
 import argparse
 import json
+import os
+import sys
+import time
+from datetime import date
 from scheduler.scheduler import Scheduler
+from scheduler.cache import DEFAULT_MAX_BYTES, ResultCache
+from scheduler.coverage import parse_demand
+from scheduler.importer import DEFAULT_INDEX
+from scheduler.ledger import Ledger
+from scheduler.exporters import EXPORTERS
+from scheduler.pipeline import parse_month, run_range
+from scheduler.profiling import CPU_MODES, CPU_SUFFIX, cpu_profile
+from scheduler.state import ScheduleState
 
 def main():
     parser = argparse.ArgumentParser(description="Harmonogram generator")
 
-    parser.add_argument("--year", type=int, required=True)
-    parser.add_argument("--month", type=int, required=True)
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--month", type=int, default=None)
     parser.add_argument("--seed", type=int, default=None)
     parser.add_argument("--out", type=str, default=None)
+    parser.add_argument("--format", dest="fmt", choices=sorted(EXPORTERS), default="xlsx",
+                        help="format wyjścia (ics: katalog z plikiem .ics na pracownika)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="tylko wypisz podsumowanie, bez zapisu plików")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="liczba kandydatów (kolejne seedy), zapisywany jest najlepszy")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="liczba procesów przy --candidates (domyślnie liczba CPU)")
+    parser.add_argument("--optimize-seconds", type=float, default=0,
+                        help="limit czasu (s) optymalizacji lokalnej po generowaniu; 0 = wyłączona")
+
+    # Tryb wielomiesięczny
+    parser.add_argument("--from", dest="start", type=str, default=None,
+                        help="pierwszy miesiąc YYYY-MM (zamiast --year/--month)")
+    parser.add_argument("--to", dest="end", type=str, default=None,
+                        help="ostatni miesiąc YYYY-MM (domyślnie = --from)")
+    parser.add_argument("--out-dir", type=str, default=".",
+                        help="katalog na pliki harm_YYYY_MM.xlsx w trybie --from/--to")
+    parser.add_argument("--state", type=str, default=None,
+                        help="plik checkpointu stanu; jeśli istnieje, praca jest wznawiana")
+    parser.add_argument("--workbook", type=str, default=None,
+                        help="jeden plik .xlsx w --out-dir z arkuszem na każdy miesiąc")
+
+    parser.add_argument("--cache", type=str, default=None,
+                        help="katalog cache wyników; powtórne uruchomienie z tymi samymi danymi i --seed nie generuje ani nie zapisuje ponownie")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="maksymalny rozmiar cache w MB (najdawniej używane wpisy są usuwane)")
+
+    parser.add_argument("--ledger", type=str, default=None,
+                        help="baza SQLite z historią przydziałów: stan sprzed miesiąca jest brany z niej, a wynik do niej dopisywany")
+
+    # Warianty "co jeśli"
+    parser.add_argument("--scenarios", type=str, default=None, metavar="PLIK",
+                        help="porównaj warianty urlopów/obsady z pliku JSON dla --year/--month zamiast zapisywać grafik")
+    parser.add_argument("--scenarios-report", type=str, default=None,
+                        help="zapisz tabelę porównania wariantów (JSON)")
+
+    # Profilowanie
+    parser.add_argument("--profile", type=str, default=None,
+                        help="zapisz czasy faz i liczniki do pliku JSON")
+    parser.add_argument("--profile-cpu", choices=CPU_MODES, default=None,
+                        help="dodatkowo profil CPU obok --profile (cprofile: .prof, sample: stosy .folded)")
+
+    # Audyt archiwum
+    parser.add_argument("--audit", nargs="+", default=None, metavar="PLIK",
+                        help="sprawdź zasady w zapisanych grafikach (.jsonl lub .xlsx, chronologicznie) zamiast generować")
+    parser.add_argument("--audit-report", type=str, default=None,
+                        help="zapisz pełny raport audytu (JSON)")
+
+    # Import archiwum xlsx
+    parser.add_argument("--import-xlsx", nargs="+", default=None, metavar="PLIK",
+                        help="odtwórz initial_stats/last_weekend_workers z zapisanych harm_YYYY_MM*.xlsx")
+    parser.add_argument("--import-out", type=str, default=None,
+                        help="zapisz odtworzone pola configu do pliku JSON (domyślnie na ekran)")
+    parser.add_argument("--import-base", type=str, default=None,
+                        help="config, którego initial_stats to liczniki sprzed pierwszego miesiąca archiwum (domyślnie zera)")
+    parser.add_argument("--import-state", type=str, default=None,
+                        help="zapisz też pełny stan (checkpoint dla --state w trybie --from/--to)")
+    parser.add_argument("--import-index", type=str, default=DEFAULT_INDEX,
+                        help="plik indeksu już sparsowanych plików; pusty napis wyłącza indeks")
+
+    # Tryb serwera
+    parser.add_argument("--serve", action="store_true",
+                        help="serwer zadań JSON (linia na zadanie) na stdin/stdout lub --socket; --config daje wartości domyślne")
+    parser.add_argument("--socket", type=str, default=None,
+                        help="ścieżka gniazda Unix dla --serve (domyślnie stdin/stdout)")
+    parser.add_argument("--queue", type=int, default=16,
+                        help="ile zadań może czekać w kolejce przy --serve (liczba wątków: --workers)")
 
     # 🔴 NAJWAŻNIEJSZE
-    parser.add_argument("--config", type=str, required=True,
-                        help="ścieżka do pliku JSON z danymi")
+    parser.add_argument("--config", type=str, default=None,
+                        help="ścieżka do pliku JSON z danymi (wymagana poza --serve)")
 
     args = parser.parse_args()
 
+    if args.serve:
+        serve(args)
+        return
+    if args.import_xlsx:
+        sys.exit(import_xlsx(args))
+    if args.audit:
+        sys.exit(audit(args))
+    if args.config is None:
+        parser.error("wymagany argument: --config")
+
+    if args.start:
+        try:
+            start = parse_month(args.start)
+            end = parse_month(args.end or args.start)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.candidates > 1:
+            parser.error("--candidates nie jest obsługiwane razem z --from/--to")
+    elif args.year is None or args.month is None:
+        parser.error("podaj --year i --month albo --from/--to")
+    if args.scenarios and args.start:
+        parser.error("--scenarios działa dla jednego miesiąca (--year/--month)")
+    if args.ledger and args.candidates > 1:
+        parser.error("--ledger nie jest obsługiwane razem z --candidates")
+    if args.profile_cpu and not args.profile:
+        parser.error("--profile-cpu wymaga --profile")
+
     # 🔴 WCZYTANIE CONFIGA
     try:
         with open(args.config, "r", encoding="utf-8") as f:
@@ -32,6 +139,7 @@ def main():
     last_weekend_workers = data.get("last_weekend_workers")
     # DODANO: Pobieranie urlopów (jeśli nie ma w pliku, dajemy pusty słownik)
     leaves = data.get("leaves", {})
+    last_week_afternoons = data.get("last_week_afternoons")
 
     # 🔴 WALIDACJA
     if initial_stats is None:
@@ -42,19 +150,179 @@ def main():
         print("❌ Brak 'last_weekend_workers' w configu")
         return
 
+    if args.scenarios:
+        sys.exit(scenarios(args, data))
+
     # 🔴 START
     sched = Scheduler(seed=args.seed)
+    if not set_demand(sched, data):
+        return
+    ledger = Ledger(args.ledger, dry_run=args.dry_run) if args.ledger else None
+    report = {} if args.profile else None
+    cpu_path = os.path.splitext(args.profile)[0] + CPU_SUFFIX[args.profile_cpu] if args.profile_cpu else None
+    t0 = time.perf_counter()
 
-    # DODANO: Przekazanie parametru leaves do metody
-    sched.generate_and_save(
-        year=args.year,
-        month=args.month,
-        employees=None,
-        out_filename=args.out,
-        initial_stats=initial_stats,
-        last_weekend_workers=last_weekend_workers,
-        leaves=leaves
-    )
+    with cpu_profile(args.profile_cpu, cpu_path):
+        if args.start:
+            state = ScheduleState.initial(date(start[0], start[1], 1), initial_stats, last_weekend_workers, last_week_afternoons)
+            try:
+                run_range(sched, start, end, state, leaves=leaves, out_dir=args.out_dir, state_path=args.state,
+                          optimize_seconds=args.optimize_seconds, workbook=args.workbook,
+                          fmt=args.fmt, dry_run=args.dry_run, report=report, ledger=ledger)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+        else:
+            # DODANO: Przekazanie parametru leaves do metody
+            sched.generate_and_save(
+                year=args.year,
+                month=args.month,
+                employees=None,
+                out_filename=args.out,
+                initial_stats=initial_stats,
+                last_weekend_workers=last_weekend_workers,
+                leaves=leaves,
+                last_week_afternoons=last_week_afternoons,
+                candidates=args.candidates,
+                workers=args.workers,
+                optimize_seconds=args.optimize_seconds,
+                fmt=args.fmt,
+                dry_run=args.dry_run,
+                report=report,
+                cache=ResultCache(args.cache, int(args.cache_size * 2**20)) if args.cache else None,
+                ledger=ledger
+            )
+    if ledger is not None:
+        ledger.close()
+
+    if report is not None:
+        report["total_seconds"] = time.perf_counter() - t0
+        report["meta"] = {"seed": args.seed, "candidates": args.candidates, "format": args.fmt,
+                          "months": f"{args.start}..{args.end or args.start}" if args.start else f"{args.year}-{args.month:02d}",
+                          "cpu_profile": cpu_path}
+        with open(args.profile, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Profil zapisany jako: {args.profile}" + (f" (CPU: {cpu_path})" if cpu_path else ""))
+
+def set_demand(sched, data):
+    # Opcjonalna krzywa zapotrzebowania na obsadę ("coverage_demand" w configu)
+    if data.get("coverage_demand") is None:
+        return True
+    try:
+        sched.coverage_demand = parse_demand(data["coverage_demand"])
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"❌ Błędne 'coverage_demand' w configu: {e}")
+        return False
+    return True
+
+def import_xlsx(args):
+    from scheduler.importer import ArchiveIndex, config_fragment, load_archive, rebuild_state
+    codes, rest = Scheduler().shift_tables
+    t0 = time.perf_counter()
+    try:
+        schedules, cached = load_archive(args.import_xlsx, codes, ArchiveIndex(args.import_index or None))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Nie można wczytać archiwum: {e}")
+        return 2
+    if not schedules:
+        print("❌ Brak grafików w podanych plikach")
+        return 2
+    base = None
+    if args.import_base:
+        with open(args.import_base, "r", encoding="utf-8") as f:
+            base = json.load(f).get("initial_stats")
+    state = rebuild_state(schedules, base, rest)
+    data = config_fragment(state, schedules[-1])
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    if args.import_out:
+        with open(args.import_out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.import_state:
+        state.save(args.import_state)
+    print(f"Zaimportowano {len(schedules)} mies. ({schedules[0].days[0]:%Y-%m}..{state.month}), "
+          f"z indeksu {cached}/{len(args.import_xlsx)} plików, {time.perf_counter() - t0:.2f} s", file=sys.stderr)
+    return 0
+
+def audit(args):
+    from scheduler.validate import Validator, load_jsonl
+    from scheduler.importer import ArchiveIndex, load_archive
+    sched = Scheduler()
+    codes = sched.shift_tables[0]
+    t0 = time.perf_counter()
+    try:
+        xlsx = [p for p in args.audit if p.endswith(".xlsx")]
+        schedules = [load_jsonl(p, codes) for p in sorted(args.audit) if p not in xlsx]
+        if xlsx:
+            schedules += load_archive(xlsx, codes, ArchiveIndex(args.import_index or None))[0]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Nie można wczytać grafiku: {e}")
+        return 2
+    schedules.sort(key=lambda m: m.days[0])
+    report = Validator(sched).audit(schedules)
+    secs = time.perf_counter() - t0
+    for m in report["months"]:
+        print(f"{m['month']}: {m['employees']} pracowników, {m['violations']} naruszeń")
+    print(f"Razem: {report['errors']} błędów, {report['warnings']} ostrzeżeń "
+          f"({', '.join(f'{k}: {v}' for k, v in sorted(report['counts'].items())) or 'brak'}) w {secs:.2f} s")
+    if args.audit_report:
+        with open(args.audit_report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["errors"] else 0
+
+def scenarios(args, data):
+    from scheduler.scenarios import compare, comparison_table, evaluate, load_scenarios
+    from scheduler.search import candidate_seeds
+    try:
+        variants = load_scenarios(args.scenarios)
+    except (OSError, ValueError) as e:
+        print(f"❌ Nie można wczytać wariantów: {e}")
+        return 2
+    # Wszystkie warianty liczone są na tym samym seedzie; bez --seed losujemy go i wypisujemy
+    seed = candidate_seeds(1, args.seed)[0]
+    sched = Scheduler(seed=seed)
+    if not set_demand(sched, data):
+        return 2
+    state = ScheduleState.initial(date(args.year, args.month, 1), data["initial_stats"], data["last_weekend_workers"],
+                                  data.get("last_week_afternoons"))
+    if args.ledger:
+        ledger = Ledger(args.ledger, dry_run=True)
+        state = ledger.state(date(args.year, args.month, 1)) or state
+        ledger.close()
+    t0 = time.perf_counter()
+    try:
+        results = evaluate(sched, args.year, args.month, state, variants, leaves=data.get("leaves", {}), seed=seed,
+                           workers=args.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    rows = compare(sched, results)
+    print(comparison_table(rows))
+    print(f"{len(results)} wariantów (seed {seed}) w {time.perf_counter() - t0:.2f} s")
+    if args.scenarios_report:
+        with open(args.scenarios_report, "w", encoding="utf-8") as f:
+            json.dump({"year": args.year, "month": args.month, "seed": seed, "scenarios": rows}, f,
+                      ensure_ascii=False, indent=2)
+    return 0
+
+def serve(args):
+    # Kalendarze, tabele zmian i eksporter (np. openpyxl) ładują się raz, przy starcie - nie przy każdym zadaniu
+    from scheduler.server import ScheduleServer, warm
+    defaults = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            defaults = json.load(f)
+    sched = Scheduler(seed=args.seed)
+    if not set_demand(sched, defaults):
+        sys.exit(2)
+    this_year = date.today().year
+    warm(sched, range(this_year - 1, this_year + 3), (args.fmt,))
+    server = ScheduleServer(sched, defaults, workers=args.workers, queue_size=args.queue)
+    if args.socket:
+        server.serve_unix(args.socket)
+    else:
+        server.serve_lines(sys.stdin, sys.stdout)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,61 @@
+# scheduler/batch.py
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .scheduler import Scheduler
+
+# Jedno zadanie wsadowe: zespół (etykieta), miesiąc, seed i dane jak w Scheduler.generate
+BatchJob = namedtuple("BatchJob", "team year month seed employees initial_stats last_weekend_workers leaves "
+                                  "last_week_afternoons", defaults=(None, None, None, None, None))
+
+EXECUTORS = ("thread", "process")
+
+# Instancja Schedulera na proces roboczy - tabele i kalendarze zostają rozgrzane między zadaniami
+_worker_scheduler = None
+
+
+def run_job(scheduler, job):
+    """Generuje jedno zadanie na podanej instancji z własnym generatorem random.Random(job.seed).
+
+    Wynik jest identyczny jak Scheduler(seed=job.seed).generate(...) wywołane sekwencyjnie.
+    """
+    t0 = time.perf_counter()
+    schedule, summary, holidays = scheduler.generate(job.year, job.month, job.employees, job.initial_stats,
+                                                     job.last_weekend_workers, job.leaves, job.last_week_afternoons,
+                                                     rng=random.Random(job.seed))
+    return {"job": job, "schedule": schedule, "summary": summary, "holidays": holidays,
+            "seconds": time.perf_counter() - t0}
+
+
+def _init_worker(scheduler):
+    global _worker_scheduler
+    _worker_scheduler = scheduler
+
+
+def _process_job(job):
+    return run_job(_worker_scheduler, job)
+
+
+def run_batch(jobs, workers=None, executor="thread", scheduler=None):
+    """Generuje wiele zadań (zespół, miesiąc, seed) współbieżnie i zwraca wyniki w kolejności jobs.
+
+    executor="thread" dzieli jedną instancję Schedulera między wątki (generate jest
+    wielowejściowe), "process" uruchamia pulę procesów jak przy --candidates.
+    workers=1 liczy wszystko po kolei w bieżącym wątku.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Nieznany executor: {executor!r} (dostępne: {', '.join(EXECUTORS)})")
+    jobs = list(jobs)
+    if scheduler is None:
+        scheduler = Scheduler()
+
+    if workers == 1 or len(jobs) <= 1:
+        return [run_job(scheduler, j) for j in jobs]
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda j: run_job(scheduler, j), jobs))
+    # Konfiguracja (SHIFTS, rotacje, próg odpoczynku) trafia do procesów raz, przy starcie puli
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scheduler,)) as pool:
+        return list(pool.map(_process_job, jobs))
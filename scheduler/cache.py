@@ -0,0 +1,86 @@
+# scheduler/cache.py
+import hashlib
+import json
+import os
+import pickle
+
+# Podbijamy przy każdej zmianie algorytmu, która zmienia wynik dla tych samych danych -
+# wersja jest częścią klucza (result_key), więc stare wpisy przestają pasować i wypadają
+# z cache przez LRU.
+# 2: remisy w odbiorach, rotacje na przełomie miesięcy, liczniki tygodni, sterowanie pokryciem
+SCHEDULER_VERSION = 2
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_SUFFIX = ".pkl"
+
+
+def result_key(**parts):
+    """Skrót SHA-256 kanonicznego JSON-a części klucza (kolejność kluczy bez znaczenia)."""
+    payload = json.dumps(dict(parts, version=SCHEDULER_VERSION), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Cache wyników na dysku adresowany treścią, z ograniczeniem rozmiaru (LRU po mtime).
+
+    Wpis to słownik z wynikiem generowania i informacją, gdzie go już zapisano
+    (outputs: {format: plik}). Pliki to pickle - katalog cache musi być zaufany,
+    tak jak sam plik konfiguracyjny.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Uszkodzony lub niezgodny wpis traktujemy jak brak
+            self._remove(path)
+            return None
+        # Odczyt odświeża pozycję w LRU
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        # Zapis atomowy, jak przy checkpoincie stanu
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
@@ -0,0 +1,166 @@
+# scheduler/coverage.py
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from .matrix import ShiftCodes
+from .utils import calendar_context, HOLIDAY, SATURDAY, SUNDAY, WORKDAY
+
+HOURS = 24
+
+# Waga osobogodziny braku i nadmiaru obsady przy wyborze dnia (braki są gorsze niż nadmiar)
+DEFAULT_WEIGHTS = {"under": 2.0, "over": 1.0}
+
+# Ile najgorszych luk (dzień, godzina) trafia do raportu
+REPORT_GAPS = 20
+
+_RANGE_RE = re.compile(r"^(\d{1,2})(?:\.00)?-(\d{1,2})(?:\.00)?$")
+_CLASSES = (WORKDAY, SATURDAY, SUNDAY, HOLIDAY)
+
+
+class CoverageTable:
+    """Godziny zegarowe każdej zmiany z katalogu SHIFTS (po id kodu).
+
+    ``span[cid]`` to krotka godzin liczonych od północy dnia zmiany; zmiana
+    przez północ ma godziny >= 24, które trafiają do następnego dnia.
+    """
+
+    def __init__(self, codes, shifts):
+        span = []
+        for c in codes.codes:
+            sh, eh, _ = shifts[c]
+            if sh is None:
+                span.append(())
+            else:
+                span.append(tuple(range(sh, eh + HOURS if eh <= sh else eh)))
+        self.span = tuple(span)
+
+
+@lru_cache(maxsize=16)
+def compile_coverage(catalog):
+    """CoverageTable dla katalogu zmian podanego jak w compile_shift_tables."""
+    shifts = dict(catalog)
+    return CoverageTable(ShiftCodes(shifts), shifts)
+
+
+def parse_demand(data):
+    """Krzywa zapotrzebowania z configu ("coverage_demand").
+
+    Klucze to klasy dni (workday, saturday, sunday, holiday) albo "default",
+    wartości to {"7-15": 2, "15-22": 1} (liczba osób w godzinach [od, do)) albo
+    lista 24 liczb. Zwraca {klasa: krotka 24 liczb}.
+    """
+    unknown = set(data) - set(_CLASSES) - {"default"}
+    if unknown:
+        raise ValueError(f"coverage_demand: nieznane klasy dni: {', '.join(sorted(unknown))}")
+    curves = {}
+    for cls, spec in data.items():
+        if isinstance(spec, list):
+            if len(spec) != HOURS:
+                raise ValueError(f"coverage_demand[{cls}]: oczekiwano {HOURS} wartości, jest {len(spec)}")
+            curve = [int(v) for v in spec]
+        else:
+            curve = [0] * HOURS
+            for rng, n in spec.items():
+                m = _RANGE_RE.match(rng.strip())
+                if not m or not 0 <= int(m.group(1)) < int(m.group(2)) <= HOURS:
+                    raise ValueError(f"coverage_demand[{cls}]: niepoprawny zakres godzin {rng!r}")
+                for h in range(int(m.group(1)), int(m.group(2))):
+                    curve[h] = int(n)
+        curves[cls] = tuple(curve)
+    default = curves.pop("default", (0,) * HOURS)
+    return {cls: curves.get(cls, default) for cls in _CLASSES}
+
+
+class Coverage:
+    """Histogram obsady dzień x godzina dla grafiku, aktualizowany przyrostowo.
+
+    ``staff[di * 24 + h]`` to liczba osób w pracy w godzinie h dnia di. Histogram
+    liczony jest kolumnami (zliczenie kodów w kolumnie dnia, potem godziny kodu),
+    a po przypięciu do macierzy (``schedule.coverage``) każda zmiana komórki
+    przesuwa tylko godziny starego i nowego kodu.
+    """
+
+    def __init__(self, schedule, table, demand=None, weights=None):
+        self.schedule = schedule
+        self.table = table
+        self.ndays = schedule.ndays
+        ctx = calendar_context(schedule.days[0].year, schedule.days[0].month)
+        self.demand = None
+        if demand is not None:
+            self.demand = array("h", (v for cls in ctx.day_class for v in demand[cls]))
+        w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.w_under, self.w_over = w["under"], w["over"]
+        self.rebuild()
+
+    def rebuild(self):
+        staff = array("h", [0]) * (self.ndays * HOURS)
+        span = self.table.span
+        limit = len(staff)
+        for di in range(self.ndays):
+            base = di * HOURS
+            for cid, n in Counter(self.schedule.column_ids(di)).items():
+                for h in span[cid]:
+                    if base + h < limit:
+                        staff[base + h] += n
+        self.staff = staff
+
+    def attach(self):
+        self.schedule.coverage = self
+        return self
+
+    def detach(self):
+        self.schedule.coverage = None
+
+    def _cells(self, di, cid):
+        base, limit = di * HOURS, len(self.staff)
+        return [base + h for h in self.table.span[cid] if base + h < limit]
+
+    def update(self, di, old, new):
+        """Zmiana kodu w jednej komórce dnia di (wołane z ScheduleMatrix.set_id)."""
+        if old == new:
+            return
+        staff = self.staff
+        for k in self._cells(di, old):
+            staff[k] -= 1
+        for k in self._cells(di, new):
+            staff[k] += 1
+
+    # --- ocena względem zapotrzebowania ---
+    def _penalty(self, k, staff):
+        d = staff - self.demand[k]
+        return -d * self.w_under if d < 0 else d * self.w_over
+
+    def delta(self, di, old, new):
+        """Zmiana kary (brak/nadmiar obsady) po zamianie old -> new w dniu di; ujemna = lepiej."""
+        if self.demand is None or old == new:
+            return 0.0
+        change = Counter(self._cells(di, new))
+        change.subtract(self._cells(di, old))
+        staff, pen = self.staff, self._penalty
+        return sum(pen(k, staff[k] + c) - pen(k, staff[k]) for k, c in change.items() if c)
+
+    def report(self):
+        """Braki i nadmiary obsady (osobogodziny): razem, dla każdej godziny doby
+        i najgorsze luki (dzień, godzina)."""
+        by_hour = [{"hour": h, "under": 0, "over": 0} for h in range(HOURS)]
+        gaps = []
+        if self.demand is not None:
+            for k, (s, d) in enumerate(zip(self.staff, self.demand)):
+                di, h = divmod(k, HOURS)
+                if s < d:
+                    by_hour[h]["under"] += d - s
+                    gaps.append((s - d, di, h))
+                elif s > d:
+                    by_hour[h]["over"] += s - d
+        gaps.sort()
+        days = self.schedule.days
+        return {"under": sum(r["under"] for r in by_hour), "over": sum(r["over"] for r in by_hour),
+                "by_hour": by_hour,
+                "gaps": [{"day": days[di].isoformat(), "hour": h, "staff": self.staff[di * HOURS + h],
+                          "demand": self.demand[di * HOURS + h]} for _, di, h in gaps[:REPORT_GAPS]]}
+
+    def histogram(self):
+        """Obsada jako lista wierszy [dzień][godzina]."""
+        return [list(self.staff[di * HOURS:(di + 1) * HOURS]) for di in range(self.ndays)]
@@ -0,0 +1,108 @@
+# scheduler/exporters.py
+import csv
+import importlib
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+# target to "moduł:funkcja" - moduł importujemy dopiero przy użyciu formatu,
+# więc np. openpyxl ładuje się tylko dla xlsx
+Exporter = namedtuple("Exporter", "name extension target")
+
+EXPORTERS = {}
+
+NON_WORK_CODES = ("OFF", "WN", "WS", "WP", "WH", "WW")
+
+
+def register(name, extension, target):
+    EXPORTERS[name] = Exporter(name, extension, target)
+
+
+def get_exporter(name):
+    """Zwraca (Exporter, funkcja eksportu); funkcja ma sygnaturę
+    ``export(scheduler, schedule, summary, holidays, year, month, filename)``."""
+    try:
+        exp = EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f"nieznany format: {name!r} (dostępne: {', '.join(sorted(EXPORTERS))})") from None
+    module, func = exp.target.split(":")
+    return exp, getattr(importlib.import_module(module, __package__), func)
+
+
+def summary_table(summary):
+    """Tabela podsumowania jako tekst (jak sekcja PODSUMOWANIE w xlsx)."""
+    header = ("Pracownik", "Suma h", "Soboty", "Niedziele", "Święta")
+    rows = [(s["employee"], s["hours"], s["saturdays"], s["sundays"], s["holidays"]) for s in summary]
+    width = max([len(header[0])] + [len(str(r[0])) for r in rows])
+    lines = [f"{header[0]:<{width}} " + " ".join(f"{h:>9}" for h in header[1:])]
+    lines += [f"{r[0]:<{width}} " + " ".join(f"{v:>9}" for v in r[1:]) for r in rows]
+    return "\n".join(lines)
+
+
+def _hours(shifts, code):
+    return shifts.get(code, (0, 0, 0))[2] if code not in NON_WORK_CODES else 0
+
+
+def export_csv(scheduler, schedule, summary, holidays, year, month, filename):
+    # Format "długi": jeden wiersz na pracownika i dzień
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["employee", "date", "code", "hours", "holiday"])
+        for e in schedule:
+            shifts = schedule[e]
+            for d in schedule.days:
+                code = shifts[d]
+                w.writerow([e, d.isoformat(), code, _hours(scheduler.SHIFTS, code), int(d in holidays)])
+
+
+def export_jsonl(scheduler, schedule, summary, holidays, year, month, filename):
+    # Jeden obiekt JSON na pracownika: zmiany dzień po dniu + liczniki z podsumowania
+    by_emp = {s["employee"]: s for s in summary}
+    with open(filename, "w", encoding="utf-8") as f:
+        for e in schedule:
+            shifts = schedule[e]
+            row = {"employee": e, "year": year, "month": month,
+                   "shifts": {d.isoformat(): shifts[d] for d in schedule.days}}
+            row.update({k: v for k, v in by_emp.get(e, {}).items() if k != "employee"})
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def _ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+
+
+def export_ics(scheduler, schedule, summary, holidays, year, month, filename):
+    # filename to katalog: jeden plik <pracownik>.ics na osobę
+    os.makedirs(filename, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    for e in schedule:
+        shifts = schedule[e]
+        slug = re.sub(r"[^\w.-]+", "_", e).strip("_") or "pracownik"
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Scheduler//harmonogram//PL",
+                 f"X-WR-CALNAME:{_ics_escape(e)} {year}-{month:02d}"]
+        for d in schedule.days:
+            code = shifts[d]
+            if code == "OFF":
+                continue
+            sh, eh, _ = scheduler.SHIFTS.get(code, (None, None, 0))
+            lines += ["BEGIN:VEVENT", f"UID:{slug}-{d.isoformat()}@scheduler", f"DTSTAMP:{stamp}",
+                      f"SUMMARY:{_ics_escape(code)}"]
+            if sh is None:
+                # Odbiory i urlopy jako wydarzenia całodniowe
+                lines += [f"DTSTART;VALUE=DATE:{d:%Y%m%d}", f"DTEND;VALUE=DATE:{d + timedelta(days=1):%Y%m%d}"]
+            else:
+                start = datetime(d.year, d.month, d.day, sh)
+                end = datetime(d.year, d.month, d.day, eh) + (timedelta(days=1) if eh <= sh else timedelta())
+                lines += [f"DTSTART:{start:%Y%m%dT%H%M%S}", f"DTEND:{end:%Y%m%dT%H%M%S}"]
+            lines.append("END:VEVENT")
+        lines.append("END:VCALENDAR")
+        with open(os.path.join(filename, f"{slug}.ics"), "w", encoding="utf-8", newline="") as f:
+            f.write("\r\n".join(lines) + "\r\n")
+
+
+register("xlsx", ".xlsx", ".xlsx:export")
+register("csv", ".csv", ".exporters:export_csv")
+register("jsonl", ".jsonl", ".exporters:export_jsonl")
+register("ics", "_ics", ".exporters:export_ics")
@@ -0,0 +1,259 @@
+# scheduler/importer.py
+import calendar
+import json
+import os
+import re
+
+from .matrix import ScheduleMatrix
+from .state import AFTERNOON_CODES, CATEGORIES, ScheduleState, default_stats
+from .utils import calendar_context, HOLIDAY, SATURDAY, SUNDAY
+
+# Wersja formatu indeksu - podbijamy, gdy zmieni się to, co w nim trzymamy
+INDEX_VERSION = 1
+DEFAULT_INDEX = ".harm_index.json"
+
+_FILE_RE = re.compile(r"harm_(\d{4})_(\d{2})")
+_MONTHS = {name: i for i, name in enumerate(calendar.month_name) if name}
+
+# Tygodniowe liczniki rotacji popołudniowych w initial_stats
+WEEK_COUNTERS = {"weeks_12_20": "12.00-20.00", "weeks_14_22": "14.00-22.00"}
+
+
+def _sheet_month(title, path):
+    """(rok, miesiąc) z nazwy arkusza ("May_2026" jak w XlsxWriter) albo z nazwy pliku."""
+    name, _, year = title.rpartition("_")
+    if name in _MONTHS and year.isdigit():
+        return int(year), _MONTHS[name]
+    m = _FILE_RE.search(os.path.basename(path))
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    raise ValueError(f"{path}: nie można ustalić miesiąca arkusza {title!r}")
+
+
+def read_xlsx(path):
+    """Czyta plik zapisany przez XlsxWriter w trybie tylko-do-odczytu, wiersz po wierszu.
+
+    Zwraca listę miesięcy {"year", "month", "rows": {pracownik: [kody dzień po dniu]}}
+    - po jednym na arkusz (plik z --workbook ma ich kilka).
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    months = []
+    try:
+        for ws in wb.worksheets:
+            year, month = _sheet_month(ws.title, path)
+            ndays = calendar.monthrange(year, month)[1]
+            rows = {}
+            for row in ws.iter_rows(min_row=3, values_only=True):
+                # Wiersze pracowników: [nazwisko, "Godziny", kody...]; wiersz godzin i sekcja
+                # podsumowania nie mają tego znacznika
+                if len(row) < 2 or row[1] != "Godziny":
+                    if row and row[0] == "PODSUMOWANIE":
+                        break
+                    continue
+                rows[row[0]] = [c if c is not None else "OFF" for c in row[2:2 + ndays]]
+            months.append({"year": year, "month": month, "rows": rows})
+    finally:
+        wb.close()
+    return months
+
+
+class ArchiveIndex:
+    """Lokalny indeks sparsowanych plików: plik niezmieniony (rozmiar i mtime) nie jest czytany ponownie."""
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self.files = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.files = data.get("files", {})
+
+    def months(self, path):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        sig = [st.st_size, st.st_mtime_ns]
+        entry = self.files.get(key)
+        if entry and entry["sig"] == sig:
+            return entry["months"], True
+        months = read_xlsx(path)
+        self.files[key] = {"sig": sig, "months": months}
+        self.dirty = True
+        return months, False
+
+    def save(self):
+        if not (self.path and self.dirty):
+            return
+        # Zapis atomowy, jak przy checkpoincie stanu
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def load_archive(paths, codes, index=None):
+    """Macierze z plików archiwum, posortowane po miesiącu; z kilku wersji tego samego
+    miesiąca (harm_..._vN) wygrywa najnowszy plik. Zwraca (macierze, liczba plików z indeksu)."""
+    by_month = {}
+    cached = 0
+    for path in sorted(paths, key=lambda p: os.stat(p).st_mtime_ns):
+        months, hit = index.months(path) if index else (read_xlsx(path), False)
+        cached += hit
+        for mo in months:
+            by_month[(mo["year"], mo["month"])] = (path, mo)
+    matrices = []
+    for (year, month), (path, mo) in sorted(by_month.items()):
+        ctx = calendar_context(year, month)
+        m = ScheduleMatrix(list(mo["rows"]), ctx.days, codes)
+        for ei, row in enumerate(mo["rows"].values()):
+            for di, code in enumerate(row):
+                if code not in codes.ids:
+                    raise ValueError(f"{path}: nieznany kod zmiany {code!r} ({m.employees[ei]}, {ctx.days[di]})")
+                m.set(ei, di, code)
+        matrices.append(m)
+    if index:
+        index.save()
+    return matrices, cached
+
+
+def _forced_days(m, ctx, ei, comp_ids, rest, before=None, chain=False):
+    """Dni robocze z popołudniem wymuszonym odpoczynkiem (jak w _assign_weekday): ranna
+    zmiana nie mieściła się po poprzednim dniu, więc osoba dostała 14-22 (albo 12-20, gdy
+    i 14-22 się nie mieściło). Ciąg zaczyna się po pracującym dniu wolnym; before i chain
+    to ostatnia zmiana i stan ciągu z końca poprzedniego miesiąca, więc ciąg przechodzi
+    przez przełom miesięcy (rotacja we wspólnym tygodniu nie jest ciągiem).
+    To nie jest rotacja. Odbiór wstawiony później w środek ciągu go nie przerywa.
+    Zwraca (dni wymuszone, stan ciągu na koniec miesiąca)."""
+    forced = set()
+    row = m.row_ids(ei)
+    allowed, n = rest.allowed[1], rest.n
+    ids = m.codes.ids
+    morning, pm_14_22, pm_12_20 = ids["07.00-15.00"], ids["14.00-22.00"], ids["12.00-20.00"]
+    prev = before
+    for di in range(m.ndays):
+        cid = row[di]
+        if not ctx.is_workday[di]:
+            chain = bool(m.codes.hours[cid])
+        elif (chain and prev is not None and not allowed[prev * n + morning]
+              and cid == (pm_14_22 if allowed[prev * n + pm_14_22] else pm_12_20)):
+            forced.add(di)
+        elif cid not in comp_ids:
+            chain = False
+        # Odbiór zajął miejsce zmiany - o odpoczynku decyduje ostatnia przepracowana zmiana
+        if cid not in comp_ids:
+            prev = cid
+    return forced, chain
+
+
+def _hidden_holder(m, week_days, forced, before, comp_ids):
+    """Osoba z 12-20 po dyżurze 14-22 nie może przyjść na 12.00 i do końca tygodnia ma
+    wymuszone 14-22, więc jej rotacji nie widać. Gdy nikt w tygodniu nie ma niewymuszonego
+    12-20, a taki ciąg po dyżurze 14-22 ma dokładnie jedna osoba, to ona miała 12-20
+    (odbiory przed ciągiem pomijamy, jak w _forced_days). Zwraca indeks tej osoby albo None."""
+    pm_14_22 = m.codes.ids["14.00-22.00"]
+    found = []
+    for ei, e in enumerate(m.employees):
+        days = [di for di in week_days if di in forced[ei]]
+        if days:
+            di = days[0] - 1
+            while di >= 0 and m.get_id(ei, di) in comp_ids:
+                di -= 1
+            if (m.get_id(ei, di) if di >= 0 else before.get(e)) == pm_14_22:
+                found.append(ei)
+    return found[0] if len(found) == 1 else None
+
+
+def rebuild_state(schedules, base_stats=None, rest=None):
+    """Stan po ostatnim miesiącu archiwum: liczniki dyżurów i tygodni popołudniowych,
+    daty ostatnich dyżurów, rotacje z ostatniego tygodnia i zmiany z ostatniego dnia.
+
+    base_stats (jak initial_stats) to punkt startowy liczników sprzed archiwum;
+    domyślnie zera. rest to RestTable katalogu zmian (domyślnie Schedulera).
+    Arkusze bez pracowników są pomijane. Rotacja, której nie widać w ostatnim
+    tygodniu archiwum (ani jako ukryte 12-20, _hidden_holder), zostaje nieznana.
+    """
+    if rest is None:
+        from .scheduler import Scheduler
+        rest = Scheduler().rest_table
+    stats = {e: dict(s) for e, s in (base_stats or {}).items()}
+    last_days = {c: {} for c in CATEGORIES}
+    afternoons, last_shifts, month = {}, {}, None
+    prev, chains = None, {}
+    cat_key = {SATURDAY: "saturdays", SUNDAY: "sundays", HOLIDAY: "holidays"}
+
+    for m in schedules:
+        if not m.employees:
+            continue
+        ctx = calendar_context(m.days[0].year, m.days[0].month)
+        cat_idx = {SATURDAY: ctx.saturday_idx, SUNDAY: ctx.sunday_idx, HOLIDAY: ctx.holiday_idx}
+        comp_ids = m.codes.id_set(("WN", "WS", "WP"))
+        # Zmiany i ciągi wymuszonych popołudni z końca poprzedniego miesiąca archiwum
+        # (jeśli bezpośrednio poprzedza)
+        before = {}
+        if prev is not None and (m.days[0] - prev.days[-1]).days == 1:
+            before = {e: prev.get_id(ei, prev.ndays - 1) for ei, e in enumerate(prev.employees)}
+        else:
+            chains = {}
+        forced = []
+        for ei, e in enumerate(m.employees):
+            days, chains[e] = _forced_days(m, ctx, ei, comp_ids, rest, before.get(e), chains.get(e, False))
+            forced.append(days)
+        for ei, e in enumerate(m.employees):
+            s = stats.setdefault(e, dict(default_stats(), **{k: 0 for k in WEEK_COUNTERS}))
+            for cat, idx in cat_idx.items():
+                worked = [di for di in idx if m.hours[ei * m.ndays + di]]
+                s[cat_key[cat]] = s.get(cat_key[cat], 0) + len(worked)
+                if worked:
+                    last_days[cat][e] = m.days[worked[-1]]
+            last_shifts[e] = m.codes.codes[m.get_id(ei, m.ndays - 1)]
+        # Tydzień rotacji: większość przepracowanych dni roboczych tygodnia na tej zmianie;
+        # tydzień na przełomie miesięcy liczy się raz, jak w generatorze (ctx.counted_weeks)
+        for w in ctx.counted_weeks:
+            holders = {key: [] for key in WEEK_COUNTERS}
+            for ei in range(len(m.employees)):
+                row = m.row_ids(ei)
+                shifts = [m.codes.codes[row[di]] for di in ctx.days_by_week[w]
+                          if ctx.is_workday[di] and m.codes.hours[row[di]] and di not in forced[ei]]
+                for key, code in WEEK_COUNTERS.items():
+                    if shifts and shifts.count(code) * 2 > len(shifts):
+                        holders[key].append(ei)
+            if not holders["weeks_12_20"]:
+                hidden = _hidden_holder(m, ctx.days_by_week[w], forced, before, comp_ids)
+                if hidden is not None:
+                    holders["weeks_12_20"].append(hidden)
+            for key, eis in holders.items():
+                for ei in eis:
+                    s = stats[m.employees[ei]]
+                    s[key] = s.get(key, 0) + 1
+        # Rotacje: kto miał najwięcej (niewymuszonych) dni danej zmiany w ostatnim tygodniu z dniami roboczymi;
+        # liczy się tylko ostatni miesiąc - wartości z wcześniejszych byłyby nieaktualne
+        afternoons = {}
+        last_week = next(w for w in reversed(ctx.weeks) if any(ctx.is_workday[di] for di in ctx.days_by_week[w]))
+        week_days = ctx.days_by_week[last_week]
+        for key, code in AFTERNOON_CODES.items():
+            cid = m.codes.ids.get(code)
+            days = [sum(m.get_id(ei, di) == cid and di not in forced[ei] for di in week_days)
+                    for ei in range(len(m.employees))]
+            ei = max(range(len(m.employees)), key=days.__getitem__)
+            if days[ei]:
+                afternoons[key] = m.employees[ei]
+        if "12-20" not in afternoons:
+            hidden = _hidden_holder(m, week_days, forced, before, comp_ids)
+            if hidden is not None:
+                afternoons["12-20"] = m.employees[hidden]
+        month = f"{m.days[0]:%Y-%m}"
+        prev = m
+    return ScheduleState(stats, last_days, afternoons, last_shifts, month)
+
+
+def config_fragment(state, last_schedule):
+    """Pola configu odtworzone ze stanu: initial_stats, last_weekend_workers
+    (dyżury w ostatni weekend ostatniego miesiąca) i last_week_afternoons."""
+    m = last_schedule
+    last = max(di for di, d in enumerate(m.days) if d.weekday() >= 5)
+    weekend = [last, last - 1] if m.days[last].weekday() == 6 and last > 0 else [last]
+    workers = [e for ei, e in enumerate(m.employees) if any(m.hours[ei * m.ndays + di] for di in weekend)]
+    return {"initial_stats": state.stats, "last_weekend_workers": workers,
+            "last_week_afternoons": state.afternoons}
@@ -0,0 +1,166 @@
+# scheduler/ledger.py
+import json
+import sqlite3
+from datetime import date, timedelta
+
+from .state import AFTERNOON_CODES, CATEGORIES, ScheduleState, default_stats
+from .utils import calendar_context, counted_week, week_monday, HOLIDAY, SATURDAY, SUNDAY
+
+# Wersja schematu bazy - podbijamy przy zmianie tabel
+# (2: tydzień rotacji zapisany poniedziałkiem tygodnia kalendarzowego)
+LEDGER_VERSION = 2
+
+# Tygodniowe liczniki rotacji popołudniowych (jak w Scheduler.generate_month)
+WEEK_COUNTERS = {"weeks_12_20": "12.00-20.00", "weeks_14_22": "14.00-22.00"}
+
+_CAT_KEY = {SATURDAY: "saturdays", SUNDAY: "sundays", HOLIDAY: "holidays"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS assignments (
+    employee TEXT NOT NULL,
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    code TEXT NOT NULL,
+    hours INTEGER NOT NULL,
+    PRIMARY KEY (employee, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assignments_category_day ON assignments (category, day);
+CREATE TABLE IF NOT EXISTS rotations (
+    employee TEXT NOT NULL,
+    week TEXT NOT NULL,
+    code TEXT NOT NULL,
+    PRIMARY KEY (week, employee)
+) WITHOUT ROWID;
+"""
+
+
+class Ledger:
+    """Trwała historia przydziałów (SQLite): jeden wiersz na pracownika i dzień.
+
+    Zamiast liczników z configu generator odczytuje z bazy stan przed miesiącem
+    (liczniki dyżurów, daty ostatnich dyżurów, rotacje, zmiany z poprzedniego dnia)
+    i po wygenerowaniu dopisuje miesiąc w jednej transakcji. Indeksy (pracownik, dzień)
+    i (kategoria, dzień) pozwalają pytać o wieloletnią historię bez czytania archiwum.
+
+    Stan sprzed pierwszego zapisanego miesiąca (z configu) jest zapamiętywany jako
+    punkt startowy przy pierwszym zapisie. Ponowne wygenerowanie miesiąca zastępuje
+    jego wiersze. Z dry_run baza jest tylko czytana.
+    """
+
+    def __init__(self, path, dry_run=False):
+        self.path = path
+        self.dry_run = dry_run
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (str(LEDGER_VERSION),))
+        version = self._meta("version")
+        if version != str(LEDGER_VERSION):
+            raise ValueError(f"{path}: nieobsługiwana wersja bazy {version} (oczekiwano {LEDGER_VERSION})")
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # --- odczyt ---
+    def state(self, first_day):
+        """Stan przed miesiącem zaczynającym się first_day albo None, jeśli baza
+        nie ma historii sprzed tego dnia (wtedy obowiązuje stan z configu)."""
+        since = self._meta("since")
+        if since is None or since >= first_day.isoformat():
+            return None
+        base = ScheduleState.from_dict(json.loads(self._meta("baseline")))
+        until = first_day.isoformat()
+        q = self.conn.execute
+
+        stats = {e: dict(s) for e, s in base.stats.items()}
+        # Jak w generate_month: każdy, kto był w grafiku, ma komplet liczników
+        for (e,) in q("SELECT DISTINCT employee FROM assignments WHERE day >= ? AND day < ?", (since, until)):
+            s = stats.setdefault(e, default_stats())
+            for key in WEEK_COUNTERS:
+                s.setdefault(key, 0)
+        for cat, e, n in q("SELECT category, employee, COUNT(*) FROM assignments "
+                           "WHERE category IN (?, ?, ?) AND day >= ? AND day < ? AND hours > 0 "
+                           "GROUP BY category, employee", (*CATEGORIES, since, until)):
+            s = stats.setdefault(e, default_stats())
+            s[_CAT_KEY[cat]] = s.get(_CAT_KEY[cat], 0) + n
+        # Tydzień na przełomie miesięcy liczy się w miesiącu z jego czwartkiem (jak w generatorze)
+        keys = {code: key for key, code in WEEK_COUNTERS.items()}
+        start = date.fromisoformat(since)
+        for week, e, code in q("SELECT week, employee, code FROM rotations WHERE week >= ? AND week < ?",
+                               (week_monday(start).isoformat(), until)):
+            monday = date.fromisoformat(week)
+            thursday = (monday + timedelta(days=3)).isoformat()
+            if code in keys and since <= thursday < until and counted_week(monday):
+                s = stats.setdefault(e, default_stats())
+                s[keys[code]] = s.get(keys[code], 0) + 1
+
+        last_days = {c: dict(days) for c, days in base.last_days.items()}
+        for cat, e, d in q("SELECT category, employee, MAX(day) FROM assignments "
+                           "WHERE category IN (?, ?, ?) AND day < ? AND hours > 0 "
+                           "GROUP BY category, employee", (*CATEGORIES, until)):
+            last_days[cat][e] = date.fromisoformat(d)
+
+        # Rotacje z ostatniego zapisanego tygodnia przed miesiącem
+        afternoons = dict(base.afternoons)
+        week = q("SELECT MAX(week) FROM rotations WHERE week < ?", (until,)).fetchone()[0]
+        if week:
+            by_code = dict(q("SELECT code, employee FROM rotations WHERE week = ?", (week,)).fetchall())
+            afternoons.update((key, by_code[code]) for key, code in AFTERNOON_CODES.items() if code in by_code)
+
+        prev = (first_day - timedelta(days=1)).isoformat()
+        last_shifts = dict(base.last_shifts)
+        last_shifts.update(q("SELECT employee, code FROM assignments WHERE day = ?", (prev,)).fetchall())
+        month = prev[:7] if q("SELECT 1 FROM assignments WHERE day = ? LIMIT 1", (prev,)).fetchone() else base.month
+        return ScheduleState(stats, last_days, afternoons, last_shifts, month)
+
+    def history(self, employee=None, category=None, start=None, end=None):
+        """Wiersze (pracownik, dzień, kategoria, kod, godziny) z zakresu [start, end), po dniach."""
+        where, args = [], []
+        for cond, value in (("employee = ?", employee), ("category = ?", category),
+                            ("day >= ?", start and start.isoformat()), ("day < ?", end and end.isoformat())):
+            if value is not None:
+                where.append(cond)
+                args.append(value)
+        sql = "SELECT employee, day, category, code, hours FROM assignments"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return [(e, date.fromisoformat(d), cat, code, h)
+                for e, d, cat, code, h in self.conn.execute(sql + " ORDER BY day, employee", args)]
+
+    # --- zapis ---
+    def record(self, schedule, weekly_pref, state):
+        """Dopisuje miesiąc (wiersze dni i tygodnie rotacji popołudniowych) w jednej transakcji.
+
+        state to stan, z którego generowano miesiąc - przy pierwszym zapisie staje się
+        punktem startowym bazy. Tydzień rotacji ma klucz poniedziałku, więc tydzień na
+        przełomie miesięcy jest w bazie raz (zapisuje go później wygenerowany miesiąc).
+        """
+        if self.dry_run:
+            return
+        days = schedule.days
+        ctx = calendar_context(days[0].year, days[0].month)
+        first, last = days[0].isoformat(), days[-1].isoformat()
+        codes, ids, hours, nd = schedule.codes.codes, schedule.ids, schedule.hours, schedule.ndays
+        iso = [d.isoformat() for d in days]
+        rows = [(e, iso[di], ctx.day_class[di], codes[ids[ei * nd + di]], hours[ei * nd + di])
+                for ei, e in enumerate(schedule.employees) for di in range(nd)]
+        afternoon = frozenset(AFTERNOON_CODES.values())
+        mondays = {w: week_monday(days[ctx.days_by_week[w][0]]).isoformat() for w in ctx.weeks}
+        weeks = [(e, mondays[w], code)
+                 for w in ctx.weeks for e, code in weekly_pref[w].items() if code in afternoon]
+        with self.conn:
+            if self._meta("since") is None:
+                self.conn.execute("INSERT INTO meta VALUES ('since', ?)", (first,))
+                self.conn.execute("INSERT INTO meta VALUES ('baseline', ?)",
+                                  (json.dumps(state.to_dict(), ensure_ascii=False),))
+            elif self._meta("since") > first:
+                raise ValueError(f"{self.path}: miesiąc {first[:7]} jest sprzed początku historii ({self._meta('since')[:7]})")
+            self.conn.execute("DELETE FROM assignments WHERE day BETWEEN ? AND ?", (first, last))
+            self.conn.execute("DELETE FROM rotations WHERE week BETWEEN ? AND ?", (mondays[ctx.weeks[0]], last))
+            self.conn.executemany("INSERT INTO assignments VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT INTO rotations VALUES (?, ?, ?)", weeks)
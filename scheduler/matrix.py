@@ -0,0 +1,145 @@
+# scheduler/matrix.py
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+
+class ShiftCodes:
+    """Tabela internowania kodów zmian: kod <-> id oraz godziny dla każdego id."""
+
+    def __init__(self, shifts):
+        self.codes = list(shifts)
+        self.ids = {c: i for i, c in enumerate(self.codes)}
+        self.hours = array("B", (shifts[c][2] for c in self.codes))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def id_set(self, codes):
+        return frozenset(self.ids[c] for c in codes if c in self.ids)
+
+
+class ScheduleMatrix(Mapping):
+    """Grafik jako macierz pracownicy x dni z id zmian i równoległą tabelą godzin.
+
+    Wiersz to pracownik, kolumna to dzień. Dla zgodności z dotychczasowym kodem
+    (np. save_xlsx) obiekt zachowuje się jak słownik ``{pracownik: {dzień: kod}}``.
+    """
+
+    def __init__(self, employees, days, codes, fill="OFF"):
+        self.employees = list(employees)
+        self.days = list(days)
+        self.emp_index = {e: i for i, e in enumerate(self.employees)}
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.codes = codes
+        self.ndays = len(self.days)
+
+        fid = codes.ids[fill]
+        size = len(self.employees) * self.ndays
+        self.ids = array("B", [fid]) * size
+        self.hours = array("B", [codes.hours[fid]]) * size
+        # Id zmian z dnia przed pierwszym dniem macierzy (None = nieznana)
+        self.before = [None] * len(self.employees)
+        # Opcjonalny histogram obsady (coverage.Coverage) aktualizowany przy każdej zmianie komórki
+        self.coverage = None
+
+    # --- dostęp po indeksach (gorąca ścieżka) ---
+    def get_id(self, ei, di):
+        return self.ids[ei * self.ndays + di]
+
+    def set_id(self, ei, di, cid):
+        k = ei * self.ndays + di
+        if self.coverage is not None:
+            self.coverage.update(di, self.ids[k], cid)
+        self.ids[k] = cid
+        self.hours[k] = self.codes.hours[cid]
+
+    def code(self, ei, di):
+        return self.codes.codes[self.ids[ei * self.ndays + di]]
+
+    def set(self, ei, di, code):
+        self.set_id(ei, di, self.codes.ids[code])
+
+    # --- redukcje po wierszach i kolumnach ---
+    def row_ids(self, ei):
+        k = ei * self.ndays
+        return self.ids[k:k + self.ndays]
+
+    def row_hours(self, ei):
+        k = ei * self.ndays
+        return sum(self.hours[k:k + self.ndays])
+
+    def column_ids(self, di):
+        return self.ids[di::self.ndays]
+
+    def column_hours(self, di):
+        return sum(self.hours[di::self.ndays])
+
+    def worked_count(self, ei, day_indices):
+        """Liczba dni z godzinami > 0 spośród podanych kolumn."""
+        k = ei * self.ndays
+        hrs = self.hours
+        return sum(1 for di in day_indices if hrs[k + di])
+
+    def column_count(self, di, id_set):
+        return sum(1 for cid in self.ids[di::self.ndays] if cid in id_set)
+
+    def reindexed(self, employees, fill="OFF"):
+        """Kopia z podaną listą pracowników: istniejące wiersze są przenoszone, nowe wypełnia fill."""
+        m = ScheduleMatrix(employees, self.days, self.codes, fill)
+        n = self.ndays
+        for ei, e in enumerate(m.employees):
+            src = self.emp_index.get(e)
+            if src is not None:
+                m.ids[ei * n:(ei + 1) * n] = self.ids[src * n:(src + 1) * n]
+                m.hours[ei * n:(ei + 1) * n] = self.hours[src * n:(src + 1) * n]
+                m.before[ei] = self.before[src]
+        return m
+
+    def copy(self):
+        return self.reindexed(self.employees)
+
+    def to_dict(self):
+        codes = self.codes.codes
+        return {e: dict(zip(self.days, (codes[c] for c in self.row_ids(ei))))
+                for ei, e in enumerate(self.employees)}
+
+    # --- widok słownikowy ---
+    def __getitem__(self, e):
+        return _RowView(self, self.emp_index[e])
+
+    def __iter__(self):
+        return iter(self.employees)
+
+    def __len__(self):
+        return len(self.employees)
+
+    def __contains__(self, e):
+        return e in self.emp_index
+
+
+class _RowView(MutableMapping):
+    """Widok jednego pracownika: ``{dzień: kod}`` zapisujący bezpośrednio do macierzy."""
+
+    __slots__ = ("_m", "_ei")
+
+    def __init__(self, matrix, ei):
+        self._m = matrix
+        self._ei = ei
+
+    def __getitem__(self, d):
+        return self._m.code(self._ei, self._m.day_index[d])
+
+    def __setitem__(self, d, code):
+        self._m.set(self._ei, self._m.day_index[d], code)
+
+    def __delitem__(self, d):
+        raise TypeError("nie można usunąć dnia z grafiku")
+
+    def __iter__(self):
+        return iter(self._m.days)
+
+    def __len__(self):
+        return self._m.ndays
+
+    def __contains__(self, d):
+        return d in self._m.day_index
@@ -0,0 +1,335 @@
+# scheduler/optimize.py
+import math
+import random
+import time
+
+from .utils import HOLIDAY, SATURDAY, SUNDAY, WORKDAY
+from .weekend import LIMITS, STAT_KEYS
+
+# Wagi składników funkcji celu (mniej = lepiej)
+DEFAULT_WEIGHTS = {"hours": 1.0, "fairness": 1.0, "clustering": 1.0}
+
+COMP_CODES = ("WN", "WS", "WP")
+# Zmiany dyżurowe, za które przysługuje odbiór (jak w Scheduler._assign_compensatory)
+EARNING_CODES = ("07.00-15.00", "14.00-22.00", "08.00-17.00")
+# Odbiór leży najwyżej tyle dni od swojego dyżuru
+COMP_WINDOW = 7
+SWAPPABLE_CODES = ("07.00-15.00", "14.00-22.00")
+
+
+class LocalSearch:
+    """Symulowane wyżarzanie po gotowym grafiku (po fazach zachłannych).
+
+    Funkcja celu: odchyłka godzin od normy + suma kwadratów liczby sobót/niedziel/świąt
+    (osoby bez zakazu dyżurów) + liczba par odbiorów w tym samym dniu. Ruchy:
+
+    * przekazanie dyżuru weekendowego/świątecznego innej osobie razem z odbiorem,
+    * przesunięcie dnia odbioru (WN/WS/WP) na inny dzień roboczy w oknie jego dyżuru,
+    * zmiana długości zmiany w dniu roboczym (ten sam początek, inna liczba godzin).
+
+    Każdy ruch to lista zmian komórek i zmian powiązań odbiór-dyżur; koszt ruchu
+    liczony jest przyrostowo z sum godzin, liczników dyżurów i obciążenia dni.
+    Ruchy łamiące zasadę odpoczynku, zakaz dyżurów grup specjalnych, blokadę
+    niedzieli po sobocie, odstępy LIMITS (także od dyżurów z poprzednich miesięcy,
+    last_days) i urlopy (WW) są odrzucane. Każdy odbiór
+    jest przypisany do swojego dyżuru i leży w oknie +-COMP_WINDOW dni od niego,
+    więc odbiorów nigdy nie jest więcej niż dyżurów: przekazanie dyżuru zabiera
+    odbiór e1 i jest odrzucane, gdy e2 nie ma dnia na nowy odbiór.
+    """
+
+    def __init__(self, ctx, schedule, base_stats, rest_table, forbidden=(), target_hours=160,
+                 weights=None, rng=random, last_days=None):
+        self.ctx = ctx
+        self.m = schedule
+        self.rest = rest_table
+        self.target = target_hours
+        self.w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.rng = rng
+
+        codes = schedule.codes
+        self.ids = codes.ids
+        self.off = codes.ids["OFF"]
+        self.ww = codes.ids["WW"]
+        self.comp_ids = codes.id_set(COMP_CODES)
+        self.earning = codes.id_set(EARNING_CODES)
+        self.swappable = codes.id_set(SWAPPABLE_CODES)
+        self.hours_of = codes.hours
+        self.rest_ids = codes.id_set(("OFF", "WN", "WS", "WP", "WH"))
+        n_emp = len(schedule.employees)
+
+        # Kody o tym samym początku (do ruchu zmiany długości)
+        self.same_start = {}
+        for c, cid in codes.ids.items():
+            if "-" in c:
+                self.same_start.setdefault(c.split("-")[0], []).append(cid)
+
+        forbidden = set(forbidden)
+        self.duty_ok = [e not in forbidden for e in schedule.employees]
+        # Ostatnie dyżury sprzed miesiąca ({kategoria: {pracownik: data}}) - odstępy przez przełom miesięcy
+        last_days = last_days or {}
+        self.last_days = {cat: [last_days.get(cat, {}).get(e) for e in schedule.employees]
+                          for cat in (SATURDAY, SUNDAY, HOLIDAY)}
+        self.candidates = [ei for ei in range(n_emp) if self.duty_ok[ei]]
+
+        # Agregaty utrzymywane przyrostowo
+        self.row_hours = [schedule.row_hours(ei) for ei in range(n_emp)]
+        self.counts = {}
+        for cat, idx in ((SATURDAY, ctx.saturday_idx), (SUNDAY, ctx.sunday_idx), (HOLIDAY, ctx.holiday_idx)):
+            key = STAT_KEYS[cat]
+            self.counts[cat] = [
+                base_stats[e].get(key, 0) + schedule.worked_count(ei, idx) if self.duty_ok[ei] else 0
+                for ei, e in enumerate(schedule.employees)
+            ]
+        self.load = [0] * schedule.ndays
+        for di in ctx.workday_idx:
+            self.load[di] = schedule.column_count(di, self.comp_ids)
+        self.duty_workers = {di: [ei for ei in range(n_emp) if schedule.hours[ei * schedule.ndays + di]]
+                             for di in ctx.duty_idx}
+        # Powiązania odbiór <-> dyżur: (ei, dzień odbioru) -> dzień dyżuru i odwrotnie
+        self.comp_duty, self.duty_comp = {}, {}
+        for ei in range(n_emp):
+            self._link_comps(ei)
+
+    def _link_comps(self, ei):
+        """Paruje odbiory osoby z jej dyżurami (ten sam typ odbioru, okno +-COMP_WINDOW).
+
+        Dyżury po kolei biorą najwcześniejszy wolny pasujący odbiór - przy oknach
+        równej długości to paruje najwięcej odbiorów. Odbiory bez dyżuru zostają
+        niepowiązane i ruchy ich nie przesuwają.
+        """
+        row = self.m.row_ids(ei)
+        free = [wd for wd in self.ctx.workday_idx if row[wd] in self.comp_ids]
+        for di in self.ctx.duty_idx:
+            if row[di] not in self.earning:
+                continue
+            comp = self._comp_for(di)
+            for cd in free:
+                if row[cd] == comp and abs(cd - di) <= COMP_WINDOW:
+                    free.remove(cd)
+                    self.comp_duty[(ei, cd)] = di
+                    self.duty_comp[(ei, di)] = cd
+                    break
+
+    # --- funkcja celu ---
+    def objective(self):
+        hours = sum(abs(self.target - h) for h in self.row_hours)
+        fairness = sum(c * c for counts in self.counts.values() for c in counts)
+        clustering = sum(x * (x - 1) // 2 for x in self.load)
+        return self.w["hours"] * hours + self.w["fairness"] * fairness + self.w["clustering"] * clustering
+
+    def _effects(self, edits):
+        """Zmiany agregatów wynikające z listy edycji [(ei, di, nowe_id)]."""
+        dh, dcount, dload = {}, {}, {}
+        ctx, m = self.ctx, self.m
+        for ei, di, new in edits:
+            old = m.get_id(ei, di)
+            dh[ei] = dh.get(ei, 0) + self.hours_of[new] - self.hours_of[old]
+            cat = ctx.day_class[di]
+            if cat == WORKDAY:
+                dl = (new in self.comp_ids) - (old in self.comp_ids)
+                if dl:
+                    dload[di] = dload.get(di, 0) + dl
+            elif self.duty_ok[ei]:
+                dc = (self.hours_of[new] > 0) - (self.hours_of[old] > 0)
+                if dc:
+                    dcount[(cat, ei)] = dcount.get((cat, ei), 0) + dc
+        return dh, dcount, dload
+
+    def delta(self, edits):
+        dh, dcount, dload = self._effects(edits)
+        t = self.target
+        d = 0.0
+        for ei, x in dh.items():
+            h = self.row_hours[ei]
+            d += self.w["hours"] * (abs(t - h - x) - abs(t - h))
+        for (cat, ei), x in dcount.items():
+            c = self.counts[cat][ei]
+            d += self.w["fairness"] * ((c + x) ** 2 - c * c)
+        for di, x in dload.items():
+            l = self.load[di]
+            d += self.w["clustering"] * ((l + x) * (l + x - 1) // 2 - l * (l - 1) // 2)
+        return d
+
+    def apply(self, edits, links=()):
+        """Wykonuje ruch: edycje komórek i zmiany powiązań [(ei, stary_odbiór, nowy_odbiór, dyżur)]."""
+        dh, dcount, dload = self._effects(edits)
+        for ei, di, new in edits:
+            if di in self.duty_workers:
+                was = self.m.hours[ei * self.m.ndays + di] > 0
+                now = self.hours_of[new] > 0
+                if was and not now:
+                    self.duty_workers[di].remove(ei)
+                elif now and not was:
+                    self.duty_workers[di].append(ei)
+            self.m.set_id(ei, di, new)
+        for ei, x in dh.items():
+            self.row_hours[ei] += x
+        for (cat, ei), x in dcount.items():
+            self.counts[cat][ei] += x
+        for di, x in dload.items():
+            self.load[di] += x
+        for ei, old, new, duty in links:
+            if old is not None:
+                del self.comp_duty[(ei, old)]
+                self.duty_comp.pop((ei, duty), None)
+            if new is not None:
+                self.comp_duty[(ei, new)] = duty
+                self.duty_comp[(ei, duty)] = new
+
+    # --- ograniczenia ---
+    def _code_at(self, ei, di, edits):
+        for e, d, new in edits:
+            if e == ei and d == di:
+                return new
+        if di < 0:
+            return self.m.before[ei]
+        if di >= self.m.ndays:
+            return None
+        return self.m.get_id(ei, di)
+
+    def rest_ok(self, edits):
+        allowed, n = self.rest.allowed[1], self.rest.n
+        for ei, di, _ in edits:
+            cur = self._code_at(ei, di, edits)
+            prev = self._code_at(ei, di - 1, edits)
+            nxt = self._code_at(ei, di + 1, edits)
+            if prev is not None and not allowed[prev * n + cur]:
+                return False
+            if nxt is not None and not allowed[cur * n + nxt]:
+                return False
+        return True
+
+    def _duty_allowed(self, ei, di):
+        """Czy ei może przejąć dyżur w dniu di (zakazy, urlop, sobota-niedziela, odstępy)."""
+        ctx, m = self.ctx, self.m
+        if not self.duty_ok[ei] or m.get_id(ei, di) != self.off:
+            return False
+        nd = m.ndays
+        if ctx.weekday[di] == 6:
+            prev = m.get_id(ei, di - 1) if di > 0 else m.before[ei]
+            if prev not in self.rest_ids:
+                return False
+        if di + 1 < nd and ctx.weekday[di + 1] == 6 and m.hours[ei * nd + di + 1]:
+            return False
+        cat = ctx.day_class[di]
+        limit = LIMITS[cat]
+        same = {SATURDAY: ctx.saturday_idx, SUNDAY: ctx.sunday_idx, HOLIDAY: ctx.holiday_idx}[cat]
+        last = self.last_days[cat][ei]
+        if last is not None and (ctx.days[di] - last).days < limit:
+            return False
+        k = ei * nd
+        return not any(abs(dj - di) < limit and m.hours[k + dj] for dj in same if dj != di)
+
+    # --- ruchy ---
+    def _comp_for(self, di):
+        return self.ids["WN"] if self.ctx.weekday[di] == 6 else (self.ids["WS"] if self.ctx.is_holiday[di] else self.ids["WP"])
+
+    def _workdays_near(self, di, span=COMP_WINDOW):
+        return [wd for wd in self.ctx.workday_idx if abs(wd - di) <= span]
+
+    def move_transfer(self):
+        """Dyżur z dnia di przechodzi z e1 na e2; odbiór e1 wraca do pracy, e2 dostaje nowy."""
+        days = [di for di, ws in self.duty_workers.items() if ws]
+        if not days:
+            return None
+        di = self.rng.choice(days)
+        e1 = self.rng.choice(self.duty_workers[di])
+        e2 = self.rng.choice(self.candidates)
+        if e1 == e2 or not self.duty_ok[e1] or not self._duty_allowed(e2, di):
+            return None
+
+        m = self.m
+        code = m.get_id(e1, di)
+        edits = [(e1, di, self.off), (e2, di, code)]
+        links = []
+        # e1: odbiór za ten dyżur wraca do pracy (kod z najbliższego dnia roboczego)
+        a = self.duty_comp.get((e1, di))
+        if a is not None:
+            work = [wd for wd in self.ctx.workday_idx if m.get_id(e1, wd) in self.swappable]
+            restore = m.get_id(e1, min(work, key=lambda wd: abs(wd - a))) if work else self.ids["07.00-15.00"]
+            edits.append((e1, a, restore))
+            links.append((e1, a, None, di))
+        # e2: odbiór w najmniej obciążonym dniu z okna; bez wolnego dnia dyżur zostaje u e1
+        if code in self.earning:
+            options = [wd for wd in self._workdays_near(di) if m.get_id(e2, wd) in self.swappable]
+            if not options:
+                return None
+            low = min(self.load[wd] for wd in options)
+            c = self.rng.choice([wd for wd in options if self.load[wd] == low])
+            edits.append((e2, c, self._comp_for(di)))
+            links.append((e2, None, c, di))
+        return edits, links
+
+    def move_comp(self):
+        """Przesunięcie jednego odbioru na inny dzień roboczy w oknie jego dyżuru."""
+        ei = self.rng.randrange(len(self.m.employees))
+        row = self.m.row_ids(ei)
+        comps = [wd for wd in self.ctx.workday_idx if (ei, wd) in self.comp_duty]
+        if not comps:
+            return None
+        a = self.rng.choice(comps)
+        duty = self.comp_duty[(ei, a)]
+        options = [wd for wd in self._workdays_near(duty) if row[wd] in self.swappable]
+        if not options:
+            return None
+        b = self.rng.choice(options)
+        return [(ei, a, row[b]), (ei, b, row[a])], [(ei, a, b, duty)]
+
+    def move_length(self):
+        """Skrócenie/wydłużenie zmiany w dniu roboczym osoby z odchyłką godzin."""
+        off_target = [ei for ei, h in enumerate(self.row_hours) if h != self.target]
+        if not off_target:
+            return None
+        ei = self.rng.choice(off_target)
+        row = self.m.row_ids(ei)
+        work = [wd for wd in self.ctx.workday_idx if self.hours_of[row[wd]]]
+        if not work:
+            return None
+        di = self.rng.choice(work)
+        code = self.m.codes.codes[row[di]]
+        options = [cid for cid in self.same_start.get(code.split("-")[0], []) if cid != row[di]]
+        if not options:
+            return None
+        return [(ei, di, self.rng.choice(options))], ()
+
+    # --- pętla główna ---
+    def run(self, seconds, t0=None):
+        moves = (self.move_transfer, self.move_transfer, self.move_comp, self.move_length)
+        start = self.objective()
+        cur = best = start
+        best_cells = (self.m.ids[:], self.m.hours[:])
+        t_begin = time.perf_counter()
+        deadline = t_begin + seconds
+        temp0 = t0 if t0 is not None else max(1.0, abs(start) * 0.001)
+        iterations = accepted = 0
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            iterations += 1
+            # Temperatura maleje geometrycznie do ~1% wartości początkowej
+            temp = temp0 * (0.01 ** ((now - t_begin) / seconds))
+            move = self.rng.choice(moves)()
+            if not move:
+                continue
+            edits, links = move
+            if not self.rest_ok(edits):
+                continue
+            d = self.delta(edits)
+            if d <= 0 or self.rng.random() < math.exp(-d / temp):
+                self.apply(edits, links)
+                cur += d
+                accepted += 1
+                if cur < best - 1e-9:
+                    best = cur
+                    best_cells = (self.m.ids[:], self.m.hours[:])
+
+        # Przywracamy najlepszy znaleziony grafik
+        self.m.ids[:] = best_cells[0]
+        self.m.hours[:] = best_cells[1]
+        # Zapis całymi tablicami omija set_id - histogram obsady liczymy od nowa
+        if self.m.coverage is not None:
+            self.m.coverage.rebuild()
+        return {"before": start, "after": best, "iterations": iterations, "accepted": accepted,
+                "seconds": round(time.perf_counter() - t_begin, 3)}
@@ -0,0 +1,121 @@
+# scheduler/pipeline.py
+import os
+import re
+
+from .exporters import get_exporter, summary_table
+from .profiling import merge, phase
+from .state import ScheduleState
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{1,2})$")
+
+
+def parse_month(text):
+    """'YYYY-MM' -> (rok, miesiąc)."""
+    m = _MONTH_RE.match(text or "")
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"niepoprawny miesiąc: {text!r} (oczekiwano YYYY-MM)")
+    return int(m.group(1)), int(m.group(2))
+
+
+def month_range(start, end):
+    """Kolejne (rok, miesiąc) od start do end włącznie."""
+    y, m = start
+    while (y, m) <= end:
+        yield y, m
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+def leaves_for(leaves, year, month, first):
+    """Urlopy dla miesiąca: {"YYYY-MM": {pracownik: [dni]}} albo płaskie {pracownik: [dni]} tylko dla pierwszego miesiąca."""
+    if not leaves:
+        return {}
+    if all(_MONTH_RE.match(k) for k in leaves):
+        return leaves.get(f"{year}-{month:02d}", {})
+    return leaves if first else {}
+
+
+def run_range(scheduler, start, end, state, leaves=None, employees=None, out_dir=".", state_path=None,
+              optimize_seconds=0, workbook=None, fmt="xlsx", dry_run=False, report=None, ledger=None):
+    """Generuje miesiące od start do end, przenosząc stan między nimi.
+
+    Każdy miesiąc jest zapisywany na dysk od razu po wygenerowaniu, a stan
+    (jeśli podano state_path) trafia do checkpointu. Jeśli checkpoint istnieje,
+    praca jest wznawiana od miesiąca po ostatnim zapisanym.
+    Z workbook wszystkie miesiące tego uruchomienia trafiają jako arkusze
+    do jednego pliku (strumieniowo); checkpoint jest wtedy zapisywany raz, po
+    zamknięciu pliku, a wznowienie nie nadpisuje istniejącego skoroszytu. fmt wybiera eksporter dla plików miesięcznych,
+    a dry_run tylko wypisuje podsumowania (bez zapisu checkpointu). Jeśli podano report, raport każdego
+    miesiąca trafia do report["months"], a czasy i liczniki są w nim sumowane.
+    Z ledger stan każdego miesiąca pochodzi z bazy historii, do której trafiają
+    kolejne wygenerowane miesiące.
+    Zwraca listę zapisanych plików.
+    """
+    if state_path and os.path.exists(state_path):
+        state = ScheduleState.load(state_path)
+        if state.month:
+            print(f"Wznawianie od stanu po {state.month} ({state_path})")
+
+    done = parse_month(state.month) if state.month else None
+    if not dry_run:
+        os.makedirs(out_dir, exist_ok=True)
+    written = []
+    writer = export = None
+    if dry_run:
+        pass
+    elif workbook:
+        # Skoroszyt powstaje dopiero przy zamknięciu - wznowienie nadpisałoby zapisane w nim miesiące
+        if done and os.path.exists(os.path.join(out_dir, workbook)):
+            raise ValueError(f"skoroszyt {os.path.join(out_dir, workbook)} już istnieje, a praca jest wznawiana "
+                             f"po {state.month} - podaj inną nazwę --workbook")
+        from .xlsx import XlsxWriter
+        writer = XlsxWriter(os.path.join(out_dir, workbook), scheduler.SHIFTS, scheduler.COLORS)
+    else:
+        exporter, export = get_exporter(fmt)
+
+    for i, (year, month) in enumerate(month_range(start, end)):
+        if done and (year, month) <= done:
+            continue
+        month_leaves = leaves_for(leaves, year, month, i == 0)
+        month_report = {}
+        schedule, summary, holidays, state = scheduler.generate_month(year, month, state, employees, month_leaves,
+                                                                      optimize_seconds, month_report, ledger=ledger)
+        if "optimize" in month_report:
+            opt = month_report["optimize"]
+            print(f"Optymalizacja {year}-{month:02d}: cel {opt['before']:.2f} -> {opt['after']:.2f}")
+        if "coverage" in month_report:
+            cov = month_report["coverage"]
+            print(f"Pokrycie {year}-{month:02d}: brak {cov['under']}, nadmiar {cov['over']} osobogodzin")
+        if month_report["validation"]["errors"]:
+            print(f"Uwaga {year}-{month:02d}: walidacja znalazła {month_report['validation']['errors']} naruszeń zasad")
+
+        if dry_run:
+            print(f"--- {year}-{month:02d} ---")
+            print(summary_table(summary))
+        elif writer:
+            with phase(month_report, "export"):
+                writer.add_month(schedule, summary, holidays, schedule.days, year, month)
+            print(f"Dodano arkusz {year}-{month:02d}")
+        else:
+            filename = os.path.join(out_dir, f"harm_{year}_{month:02d}{exporter.extension}")
+            with phase(month_report, "export"):
+                export(scheduler, schedule, summary, holidays, year, month, filename)
+            written.append(filename)
+            print(f"Sukces! Grafik zapisany jako: {filename}")
+        if report is not None:
+            report.setdefault("months", {})[f"{year}-{month:02d}"] = month_report
+            merge(report, month_report)
+        # Zwalniamy miesiąc przed kolejnym - w pamięci trzymamy tylko stan
+        del schedule, summary
+
+        # Ze skoroszytem checkpoint zapisujemy dopiero po jego zamknięciu: przerwana praca
+        # zaczyna się od nowa zamiast pominąć miesiące, których nie ma w żadnym pliku
+        if state_path and not dry_run and not writer:
+            state.save(state_path)
+
+    if writer:
+        writer.close()
+        written.append(writer.filename)
+        print(f"Sukces! Grafik zapisany jako: {writer.filename}")
+        if state_path:
+            state.save(state_path)
+    return written
@@ -0,0 +1,106 @@
+# scheduler/profiling.py
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+_NULL = nullcontext()
+
+CPU_MODES = ("cprofile", "sample")
+CPU_SUFFIX = {"cprofile": ".prof", "sample": ".folded"}
+
+
+@contextmanager
+def _timed(phases, name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - t0
+
+
+def phase(report, name):
+    """Mierzy czas fazy do report["phases"][name]; bez raportu nic nie robi."""
+    if report is None:
+        return _NULL
+    return _timed(report.setdefault("phases", {}), name)
+
+
+def count(report, **counters):
+    """Dodaje liczniki do report["counters"]; bez raportu nic nie robi."""
+    if report is None:
+        return
+    acc = report.setdefault("counters", {})
+    for name, n in counters.items():
+        acc[name] = acc.get(name, 0) + n
+
+
+def merge(report, part):
+    """Sumuje fazy i liczniki z raportu cząstkowego (np. jednego miesiąca)."""
+    if report is None:
+        return
+    for name, secs in part.get("phases", {}).items():
+        phases = report.setdefault("phases", {})
+        phases[name] = phases.get(name, 0.0) + secs
+    count(report, **part.get("counters", {}))
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+@contextmanager
+def _sampled(path, interval):
+    """Próbkuje stos bieżącego wątku i zapisuje go w formacie 'folded' (flamegraph.pl, speedscope)."""
+    target = threading.get_ident()
+    stacks = Counter()
+    stop = threading.Event()
+
+    def sampler():
+        while not stop.wait(interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stacks[_frame_stack(frame)] += 1
+
+    t = threading.Thread(target=sampler, name="profiling-sampler", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+@contextmanager
+def _cprofiled(path):
+    import cProfile
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(path)
+
+
+def cpu_profile(mode, path, interval=0.001):
+    """Profil CPU całego przebiegu: 'cprofile' (plik .prof) albo 'sample' (stosy folded).
+
+    Bez trybu nic nie robi - koszt profilowania ponosi tylko ten, kto o nie prosi.
+    """
+    if mode is None:
+        return _NULL
+    if mode == "cprofile":
+        return _cprofiled(path)
+    if mode == "sample":
+        return _sampled(path, interval)
+    raise ValueError(f"Nieznany tryb profilowania CPU: {mode!r} (dostępne: {', '.join(CPU_MODES)})")
@@ -0,0 +1,268 @@
+# scheduler/replan.py
+from collections import namedtuple
+from datetime import date
+
+from .profiling import count
+from .state import ScheduleState
+from .utils import calendar_context, HOLIDAY, SATURDAY, SUNDAY
+from .weekend import LIMITS, STAT_KEYS
+
+# Zmiana w grafiku: kind in KINDS, days to dni miesiąca (int) albo daty.
+# Dla "add"/"remove" days[0] (opcjonalnie) to pierwszy dzień zmiany, domyślnie początek miesiąca.
+Change = namedtuple("Change", "kind employee days", defaults=((),))
+
+# L4 nie ma osobnego kodu w katalogu zmian - jak urlop wpisujemy WW
+KINDS = ("leave", "sick", "add", "remove")
+
+EARNING_CODES = ("07.00-15.00", "14.00-22.00", "08.00-17.00")
+SWAPPABLE_CODES = ("07.00-15.00", "14.00-22.00")
+REST_CODES = ("OFF", "WN", "WS", "WP", "WH")
+COMP_CODES = ("WN", "WS", "WP")
+# Zmiany, którymi zastępujemy cofnięty odbiór, jeśli nie ma zmiany z tego tygodnia
+FALLBACK_SHIFTS = ("07.00-15.00", "14.00-22.00", "12.00-20.00")
+# Jak w Scheduler._assign_weekday: po dyżurze zamiast rannej zmiany wstawiamy popołudnie
+AFTERNOON_FIXES = ("14.00-22.00", "12.00-20.00")
+# Odbiór leży najwyżej tyle dni od dyżuru (jak w Scheduler._assign_compensatory)
+COMP_WINDOW = 7
+
+
+class _Replanner:
+    """Lokalne poprawki jednej macierzy; każda zmiana komórki trafia do touched."""
+
+    def __init__(self, scheduler, schedule, state, rng):
+        self.s = scheduler
+        self.m = schedule
+        self.ctx = calendar_context(schedule.days[0].year, schedule.days[0].month)
+        self.state = state
+        self.rng = rng
+        codes = schedule.codes
+        self.ids = codes.ids
+        self.rest = scheduler.rest_table
+        self.earning = codes.id_set(EARNING_CODES)
+        self.swappable = codes.id_set(SWAPPABLE_CODES)
+        self.rest_ids = codes.id_set(REST_CODES)
+        self.comp_ids = codes.id_set(COMP_CODES)
+        self.ww = self.ids["WW"]
+        self.off = self.ids["OFF"]
+        self.forbidden = set(scheduler.special_rotation) | set(scheduler.special_rotation_2)
+        self.cat_idx = {SATURDAY: self.ctx.saturday_idx, SUNDAY: self.ctx.sunday_idx, HOLIDAY: self.ctx.holiday_idx}
+        self.touched = []
+        self.rows = set()
+        self.unfilled = []
+        self.comp_lost = 0
+
+    # --- pomocnicze ---
+    def day_index(self, d):
+        if not isinstance(d, date):
+            d = date(self.ctx.year, self.ctx.month, d)
+        if d not in self.ctx.day_index:
+            raise ValueError(f"dzień {d} spoza grafiku {self.ctx.year}-{self.ctx.month:02d}")
+        return self.ctx.day_index[d]
+
+    def set(self, ei, di, cid):
+        old = self.m.get_id(ei, di)
+        if old == cid:
+            return
+        codes = self.m.codes.codes
+        self.touched.append((self.m.employees[ei], self.m.days[di].isoformat(), codes[old], codes[cid]))
+        self.rows.add(ei)
+        self.m.set_id(ei, di, cid)
+
+    def comp_code(self, di):
+        # Niedziela ma pierwszeństwo przed świętem, święto przed sobotą
+        ctx = self.ctx
+        return self.ids["WN" if ctx.weekday[di] == 6 else ("WS" if ctx.is_holiday[di] else "WP")]
+
+    def rest_ok(self, ei, di, cid):
+        m = self.m
+        prev = m.get_id(ei, di - 1) if di > 0 else m.before[ei]
+        if not self.rest.ok(self.off if prev is None else prev, cid):
+            return False
+        return di + 1 >= m.ndays or self.rest.ok(cid, m.get_id(ei, di + 1))
+
+    def next_fix(self, ei, di, cid):
+        """Czy da się wpisać cid w dniu di: lista poprawek [(dzień, popołudnie)] albo False.
+
+        Zasadę odpoczynku przed di trzeba spełnić wprost; rannych zmian po di nie
+        tracimy, tylko (jak w generowaniu) zamieniamy je kolejno na popołudniowe.
+        """
+        m = self.m
+        prev = m.get_id(ei, di - 1) if di > 0 else m.before[ei]
+        if not self.rest.ok(self.off if prev is None else prev, cid):
+            return False
+        fixes = []
+        cur, nxt = cid, di + 1
+        while nxt < m.ndays and not self.rest.ok(cur, m.get_id(ei, nxt)):
+            if not self.ctx.is_workday[nxt] or m.get_id(ei, nxt) not in self.swappable:
+                return False
+            pm = next((self.ids[c] for c in AFTERNOON_FIXES if self.rest.ok(cur, self.ids[c])), None)
+            if pm is None:
+                return False
+            fixes.append((nxt, pm))
+            cur, nxt = pm, nxt + 1
+        return fixes
+
+    def comp_days(self, ei, di, exclude=()):
+        """Dni robocze z oknie odbioru dnia di, na które można wstawić odbiór."""
+        row = self.m.row_ids(ei)
+        return [wd for wd in self.ctx.workday_idx
+                if abs(wd - di) <= COMP_WINDOW and row[wd] in self.swappable and wd not in exclude]
+
+    def place_comp(self, ei, di, comp, exclude=()):
+        days = self.comp_days(ei, di, exclude)
+        if not days:
+            return False
+        # Jak w generowaniu: najmniej odbiorów tego dnia, remis losowany z generatora
+        load = {wd: self.m.column_count(wd, self.comp_ids) for wd in days}
+        low = min(load.values())
+        best = [wd for wd in days if load[wd] == low]
+        self.set(ei, best[0] if len(best) == 1 else self.rng.choice(best), comp)
+        return True
+
+    def revert_comp(self, ei, di, blocked):
+        """Cofa odbiór powiązany z utraconym dyżurem di (najbliższy w oknie) na zwykłą zmianę."""
+        comp = self.comp_code(di)
+        row = self.m.row_ids(ei)
+        linked = [wd for wd in self.ctx.workday_idx
+                  if abs(wd - di) <= COMP_WINDOW and row[wd] == comp and wd not in blocked]
+        if not linked:
+            return
+        wd = min(linked, key=lambda x: (abs(x - di), x))
+        # Zmiana, którą ta osoba ma w tym tygodniu, a jeśli brak - standardowe
+        week = self.ctx.days_by_week[self.ctx.week_of[wd]]
+        usual = [row[x] for x in week if self.ctx.is_workday[x] and self.m.codes.hours[row[x]]]
+        options = ([max(set(usual), key=usual.count)] if usual else []) + [self.ids[c] for c in FALLBACK_SHIFTS]
+        for cid in options:
+            if self.rest_ok(ei, wd, cid):
+                self.set(ei, wd, cid)
+                return
+
+    # --- dyżury ---
+    def rank(self, ei, di, cat):
+        """Klucz jak w WeekendAllocator: najpierw wypoczęci (mniej dyżurów, dawniej), potem reszta."""
+        e = self.m.employees[ei]
+        d = self.m.days[di]
+        worked = [self.m.days[x] for x in self.cat_idx[cat] if x != di and self.m.hours[ei * self.m.ndays + x]]
+        last = self.state.last_days[cat].get(e)
+        gaps = [abs((d - x).days) for x in worked + ([last] if last else [])]
+        gap = min(gaps) if gaps else 10 ** 6
+        n = self.state.stats_for(e)[STAT_KEYS[cat]] + len(worked)
+        return (0, n, -gap, ei) if gap >= LIMITS[cat] else (1, -gap, n, ei)
+
+    def eligible(self, ei, di, shift, exclude):
+        m = self.m
+        if ei in exclude or m.employees[ei] in self.forbidden or m.get_id(ei, di) not in self.rest_ids:
+            return False
+        weekday = self.ctx.weekday[di]
+        # Bez niedzieli po pracującej sobocie (nieznaną sobotę spoza miesiąca traktujemy jak pracującą)
+        if weekday == 6:
+            prev = m.get_id(ei, di - 1) if di > 0 else m.before[ei]
+            if prev not in self.rest_ids:
+                return False
+        if weekday == 5 and di + 1 < m.ndays and self.ctx.weekday[di + 1] == 6 and m.hours[ei * m.ndays + di + 1]:
+            return False
+        return self.next_fix(ei, di, shift) is not False
+
+    def substitute(self, di, shift, exclude):
+        """Obsadza zwolniony dyżur; zastępca dostaje odbiór w oknie dyżuru."""
+        cat = self.ctx.day_class[di]
+        cands = [ei for ei in range(len(self.m.employees)) if self.eligible(ei, di, shift, exclude)]
+        needs_comp = shift in self.earning
+        if needs_comp:
+            # Zastępca z możliwym odbiorem ma pierwszeństwo - nie gubimy mu dnia wolnego
+            with_comp = [ei for ei in cands if self.comp_days(ei, di)]
+            cands = with_comp or cands
+        if not cands:
+            self.unfilled.append((self.m.days[di].isoformat(), self.m.codes.codes[shift]))
+            return
+        # Przy remisie wolimy osoby, którym trzeba przestawić najmniej kolejnych dni
+        ei = min(cands, key=lambda x: (self.rank(x, di, cat)[:3], len(self.next_fix(x, di, shift)), x))
+        fixes = self.next_fix(ei, di, shift)
+        self.set(ei, di, shift)
+        for fd, pm in fixes:
+            self.set(ei, fd, pm)
+        if needs_comp and not self.place_comp(ei, di, self.comp_code(di)):
+            self.comp_lost += 1
+
+    def vacate(self, ei, di, cid, blocked, leaving=False):
+        """Wpisuje cid (WW/OFF) i naprawia skutki: dyżur, jego odbiór albo przesunięty odbiór."""
+        old = self.m.get_id(ei, di)
+        if old == cid:
+            return
+        self.set(ei, di, cid)
+        if not self.ctx.is_workday[di] and self.m.codes.hours[old]:
+            self.substitute(di, old, {ei})
+            if old in self.earning and not leaving:
+                self.revert_comp(ei, di, blocked)
+        elif old in self.comp_ids and not leaving:
+            # Urlop w dniu odbioru - odbiór przenosimy na inny dzień okna
+            if not self.place_comp(ei, di, old, exclude=blocked):
+                self.comp_lost += 1
+
+
+def replan(scheduler, schedule, changes, state=None, rng=None, report=None):
+    """Nanosi zmiany na kopię grafiku i poprawia tylko to, czego dotyczą.
+
+    * "leave"/"sick": WW w podanych dniach; zwolniony dyżur weekendowy/świąteczny
+      przejmuje najbardziej wypoczęta uprawniona osoba (jak w kolejkach dyżurów),
+      dostaje odbiór w oknie +-7 dni, a odbiór osoby na urlopie wraca do pracy;
+      urlop w dniu odbioru przenosi odbiór na inny dzień okna;
+    * "remove": od podanego dnia osoba znika z grafiku, jej dyżury są obsadzane jak wyżej;
+    * "add": nowy wiersz, od podanego dnia poranne zmiany w dni robocze, bez dyżurów.
+
+    Na koniec godziny dotkniętych osób są dociągane jak w generowaniu. Pozostałe
+    komórki się nie zmieniają. state to stan sprzed miesiąca (statystyki i daty
+    ostatnich dyżurów do wyboru zastępców). Zwraca (grafik, podsumowanie); lista
+    zmienionych komórek i nieobsadzonych dyżurów trafia do report["replan"].
+    """
+    state = state or ScheduleState()
+    rng = rng or scheduler.rng
+    schedule = schedule.copy()
+
+    adds = [c for c in changes if c.kind == "add"]
+    for c in changes:
+        if c.kind not in KINDS:
+            raise ValueError(f"nieznany rodzaj zmiany: {c.kind!r} (dostępne: {', '.join(KINDS)})")
+        if c.kind != "add" and c.employee not in schedule:
+            raise ValueError(f"brak pracownika w grafiku: {c.employee!r}")
+    if adds:
+        schedule = schedule.reindexed(schedule.employees + [c.employee for c in adds if c.employee not in schedule])
+
+    r = _Replanner(scheduler, schedule, state, rng)
+    dropped = []
+    for c in changes:
+        ei = schedule.emp_index[c.employee]
+        if c.kind in ("leave", "sick"):
+            days = sorted({r.day_index(d) for d in c.days})
+            for di in days:
+                r.vacate(ei, di, r.ww, set(days))
+        elif c.kind == "remove":
+            since = r.day_index(c.days[0]) if c.days else 0
+            for di in range(since, schedule.ndays):
+                r.vacate(ei, di, r.off, (), leaving=True)
+            r.rows.discard(ei)
+            if since == 0:
+                dropped.append(c.employee)
+        else:
+            since = r.day_index(c.days[0]) if c.days else 0
+            morning = r.ids[FALLBACK_SHIFTS[0]]
+            for di in r.ctx.workday_idx:
+                if di >= since and schedule.get_id(ei, di) == r.off and r.rest_ok(ei, di, morning):
+                    r.set(ei, di, morning)
+
+    rows = sorted(r.rows)
+    before = {ei: schedule.row_ids(ei) for ei in rows}
+    scheduler._adjust_last_day_hours(r.ctx, schedule, rows=rows)
+    for ei in rows:
+        codes = schedule.codes.codes
+        for di, (old, new) in enumerate(zip(before[ei], schedule.row_ids(ei))):
+            if old != new:
+                r.touched.append((schedule.employees[ei], schedule.days[di].isoformat(), codes[old], codes[new]))
+    if dropped:
+        schedule = schedule.reindexed([e for e in schedule.employees if e not in dropped])
+
+    summary = scheduler._summary(r.ctx, schedule, {e: state.stats_for(e) for e in schedule.employees})
+    if report is not None:
+        report["replan"] = {"touched": r.touched, "unfilled": r.unfilled, "comp_lost": r.comp_lost}
+    count(report, replan_cells=len(r.touched))
+    return schedule, summary
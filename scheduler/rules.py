@@ -0,0 +1,63 @@
+# scheduler/rules.py
+from functools import lru_cache
+
+from .matrix import ShiftCodes
+
+# Domyślny minimalny odpoczynek między zmianami (w godzinach)
+MIN_REST_HOURS = 16
+
+
+class RestTable:
+    """Skompilowana tabela dozwolonych przejść (poprzednia zmiana, następna zmiana, odstęp w dniach).
+
+    ``allowed[gap][prev_id * n + next_id]`` to 1, jeśli między zmianami jest co najmniej
+    ``min_rest`` godzin. Dla odstępów >= ``len(allowed)`` każde przejście jest dozwolone.
+    Kody bez godzin (OFF, WN, WS, WP, WH, WW) nigdy nie łamią zasady odpoczynku.
+    """
+
+    def __init__(self, codes, shifts, min_rest=MIN_REST_HOURS):
+        self.codes = codes
+        self.min_rest = min_rest
+        n = self.n = len(codes)
+
+        # (start, koniec) w godzinach od północy dnia zmiany; None dla dni wolnych
+        span = []
+        for c in codes.codes:
+            sh, eh, _ = shifts[c]
+            if sh is None:
+                span.append(None)
+            else:
+                span.append((sh, eh + 24 if eh <= sh else eh))
+
+        self.working = tuple(s is not None for s in span)
+        allowed = []
+        gap = 0
+        while True:
+            table = bytearray(b"\x01") * (n * n)
+            for p, ps in enumerate(span):
+                if ps is None:
+                    continue
+                for q, qs in enumerate(span):
+                    if qs is not None and gap * 24 + qs[0] - ps[1] < min_rest:
+                        table[p * n + q] = 0
+            allowed.append(bytes(table))
+            # Kończymy, gdy przy tym odstępie każde przejście jest już dozwolone
+            if all(table):
+                break
+            gap += 1
+        self.allowed = tuple(allowed)
+
+    def ok(self, prev_id, next_id, gap=1):
+        if gap >= len(self.allowed):
+            return True
+        if gap < 0:
+            return not (self.working[prev_id] and self.working[next_id])
+        return bool(self.allowed[gap][prev_id * self.n + next_id])
+
+
+@lru_cache(maxsize=16)
+def compile_shift_tables(catalog, min_rest=MIN_REST_HOURS):
+    """Zwraca (ShiftCodes, RestTable) dla katalogu zmian podanego jako krotka par (kod, (start, koniec, godziny))."""
+    shifts = dict(catalog)
+    codes = ShiftCodes(shifts)
+    return codes, RestTable(codes, shifts, min_rest)
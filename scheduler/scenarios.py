@@ -0,0 +1,156 @@
+# scheduler/scenarios.py
+import json
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .batch import EXECUTORS
+from .rules import compile_shift_tables
+from .search import score_schedule
+from .utils import calendar_context
+
+# Wariant "co jeśli": dodatkowe urlopy (dopisywane do bazowych) i zmiany obsady
+Scenario = namedtuple("Scenario", "name leaves add remove", defaults=(None, (), ()))
+
+BASELINE = "bazowy"
+
+# Instancja Schedulera i wspólne dane miesiąca w procesie roboczym
+_worker = None
+
+
+def parse_scenarios(data):
+    """Warianty z JSON-a: lista {"name", "leaves": {pracownik: [dni]}, "add": [...], "remove": [...]}."""
+    if isinstance(data, dict):
+        data = data.get("scenarios", [])
+    out = []
+    for i, item in enumerate(data, 1):
+        unknown = set(item) - set(Scenario._fields)
+        if unknown:
+            raise ValueError(f"wariant {i}: nieznane pola {', '.join(sorted(unknown))}")
+        out.append(Scenario(item.get("name") or f"wariant {i}", item.get("leaves") or {},
+                            tuple(item.get("add") or ()), tuple(item.get("remove") or ())))
+    return out
+
+
+def load_scenarios(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_scenarios(json.load(f))
+
+
+def _roster(employees, sc):
+    missing = [e for e in sc.remove if e not in employees]
+    if missing:
+        raise ValueError(f"{sc.name}: nie ma w obsadzie: {', '.join(missing)}")
+    return tuple([e for e in employees if e not in sc.remove] + [e for e in sc.add if e not in employees])
+
+
+def _leaves(base, extra):
+    # Urlop wariantu dopisuje dni do urlopu bazowego tej osoby
+    merged = {e: list(days) for e, days in (base or {}).items()}
+    for e, days in extra.items():
+        merged[e] = sorted(set(merged.get(e, ())) | set(days))
+    return merged
+
+
+def _run(scheduler, shared, task):
+    year, month, state, prefs = shared
+    name, roster, leaves = task
+    weekly_pref, rng_state = prefs[roster]
+    rng = random.Random()
+    rng.setstate(rng_state)
+    report = {}
+    t0 = time.perf_counter()
+    schedule, summary, _, _ = scheduler.generate_month(year, month, state, list(roster), leaves, report=report,
+                                                       rng=rng, weekly_pref=weekly_pref)
+    return {"name": name, "schedule": schedule, "summary": summary, "validation": report["validation"],
+            "coverage": report.get("coverage"), "seconds": time.perf_counter() - t0}
+
+
+def _init_worker(scheduler, shared):
+    global _worker
+    _worker = (scheduler, shared)
+
+
+def _process_run(task):
+    return _run(*_worker, task)
+
+
+def evaluate(scheduler, year, month, state, scenarios, employees=None, leaves=None, seed=0, workers=None,
+             executor="thread"):
+    """Ocenia warianty jednego miesiąca względem grafiku bazowego (pierwszy wiersz wyniku).
+
+    Kalendarz, tabele zmian i preferencje tygodniowe są liczone raz (preferencje raz na
+    obsadę), a każdy wariant startuje z tym samym seedem, więc różnice wynikają tylko
+    z wariantu. Warianty liczone są równolegle jak w batch.run_batch. Zwraca listę
+    wyników {"name", "schedule", "summary", "validation", "coverage", "seconds"}.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Nieznany executor: {executor!r} (dostępne: {', '.join(EXECUTORS)})")
+    employees = tuple(employees or scheduler.employees)
+    ctx = calendar_context(year, month)
+    compile_shift_tables(tuple(scheduler.SHIFTS.items()), scheduler.MIN_REST_HOURS)
+
+    tasks = [(BASELINE, employees, leaves or {})]
+    tasks += [(sc.name, _roster(employees, sc), _leaves(leaves, sc.leaves)) for sc in scenarios]
+    prefs = {}
+    for _, roster, _ in tasks:
+        if roster not in prefs:
+            rng = random.Random(seed)
+            prefs[roster] = (scheduler._make_weekly_pref(ctx, list(roster), rng, state.afternoons), rng.getstate())
+    shared = (year, month, state, prefs)
+
+    if workers == 1 or len(tasks) <= 1:
+        return [_run(scheduler, shared, t) for t in tasks]
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda t: _run(scheduler, shared, t), tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scheduler, shared)) as pool:
+        return list(pool.map(_process_run, tasks))
+
+
+def compare(scheduler, results, target_hours=None):
+    """Tabela porównania: wiersz na wariant z miarami podsumowania i różnicą względem bazowego."""
+    from .scheduler import TARGET_HOURS
+    target = TARGET_HOURS if target_hours is None else target_hours
+    exclude = set(scheduler.special_rotation) | set(scheduler.special_rotation_2)
+    base = results[0]
+    rows = []
+    for r in results:
+        summary = r["summary"]
+        duty = [s for s in summary if s["employee"] not in exclude]
+        row = {"name": r["name"],
+               "score": round(score_schedule(r["schedule"], summary, exclude=exclude, target_hours=target), 2)}
+        for key in ("saturdays", "sundays", "holidays"):
+            vals = [s[key] for s in duty]
+            row[f"{key}_spread"] = max(vals) - min(vals) if vals else 0
+        row["hours_off"] = sum(s["hours"] != target for s in summary)
+        row["hours_dev"] = sum(abs(s["hours"] - target) for s in summary)
+        row["under"] = r["coverage"]["under"] if r.get("coverage") else 0
+        row["errors"] = r["validation"]["errors"]
+        row["changed"] = _changed(base["schedule"], r["schedule"])
+        rows.append(row)
+    return rows
+
+
+def _changed(a, b):
+    # Komórki (pracownik, dzień) z innym kodem niż w grafiku bazowym; osoby spoza obu obsad pomijamy
+    n = 0
+    for ei, e in enumerate(b.employees):
+        if e in a.emp_index:
+            ai = a.emp_index[e]
+            n += sum(x != y for x, y in zip(a.row_ids(ai), b.row_ids(ei)))
+    return n
+
+
+COLUMNS = (("name", "Wariant"), ("score", "Ocena"), ("saturdays_spread", "Rozrzut sob."),
+           ("sundays_spread", "Rozrzut niedz."), ("holidays_spread", "Rozrzut św."), ("hours_off", "Poza normą"),
+           ("hours_dev", "Odchyłka h"), ("under", "Braki obsady"), ("errors", "Błędy"), ("changed", "Zmienione"))
+
+
+def comparison_table(rows):
+    """Tabela porównania jako tekst (jak exporters.summary_table)."""
+    width = max([len(COLUMNS[0][1])] + [len(str(r["name"])) for r in rows])
+    lines = [f"{COLUMNS[0][1]:<{width}} " + " ".join(f"{h:>14}" for _, h in COLUMNS[1:])]
+    lines += [f"{r['name']:<{width}} " + " ".join(f"{r[k]:>14}" for k, _ in COLUMNS[1:]) for r in rows]
+    return "\n".join(lines)
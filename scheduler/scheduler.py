@@ -1,15 +1,28 @@
-import random, calendar
+import random
 from datetime import datetime, timedelta, date
-from collections import defaultdict, Counter
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
-from .utils import month_days, polish_holidays
+from bisect import bisect_left, bisect_right
+from .utils import calendar_context, week_index, HOLIDAY, SATURDAY, SUNDAY
+from .matrix import ScheduleMatrix
+from .rules import MIN_REST_HOURS, compile_shift_tables
+from .weekend import WeekendAllocator
+from .state import AFTERNOON_CODES, ScheduleState
+from .optimize import LocalSearch
+from .exporters import get_exporter, summary_table
+from .profiling import count, phase
+from .cache import result_key
+from .validate import Validator, report_dict
+from .coverage import Coverage, compile_coverage
 import os
 
+# Miesięczna norma godzin, do której dociągamy ostatni dzień roboczy
+TARGET_HOURS = 160
+
 class Scheduler:
     def __init__(self, seed=None):
-        if seed is not None:
-            random.seed(seed)
+        self.seed = seed
+        # Prywatny generator zamiast globalnego modułu random: kilka instancji
+        # (np. w wątkach) nie miesza sobie losowości. Ten sam seed daje tę samą sekwencję.
+        self.rng = random.Random(seed)
 
         # 1. Definiujemy grupy
         self.special_rotation_2 = ["T Marek", "N Wojciech", "K Hubert"]
@@ -35,6 +48,12 @@ class Scheduler:
             "OFF": (None, None, 0), "WN": (None, None, 0), "WS": (None, None, 0),
             "WP": (None, None, 0), "WW": (None, None, 0), "WH": (None, None, 0),
         }
+        # Minimalny odpoczynek między zmianami; zmiana tej wartości lub SHIFTS przebudowuje tabelę przejść
+        self.MIN_REST_HOURS = MIN_REST_HOURS
+        # Zapotrzebowanie na obsadę godzina po godzinie (coverage.parse_demand); None = bez sterowania pokryciem.
+        # Steruje wyborem dni odbioru i korektą godzin (zawsze w granicach zasady odpoczynku);
+        # rotacje dni roboczych i obsada weekendów zostają regułowe, dla nich pokrycie jest tylko raportowane
+        self.coverage_demand = None
         self.COLORS = {
             "saturday": "FF892E", "sunday": "FF892E", "holiday": "CD3C32", "header": "CD3C32", "odbior": "92D050"
         }
@@ -48,28 +67,46 @@ class Scheduler:
         if eh <= sh: end += timedelta(days=1)
         return start, end
 
+    @property
+    def shift_tables(self):
+        # Kompilacja jest cache'owana po zawartości katalogu i progu odpoczynku
+        return compile_shift_tables(tuple(self.SHIFTS.items()), self.MIN_REST_HOURS)
+
+    @property
+    def coverage_table(self):
+        return compile_coverage(tuple(self.SHIFTS.items()))
+
+    @property
+    def rest_table(self):
+        return self.shift_tables[1]
+
     def rest_ok(self, prev_code, prev_date, next_code, next_date):
-        if prev_code in (None, "OFF", "WN", "WS", "WP", "WH") or next_code in (None, "OFF", "WN", "WS", "WP", "WH"):
+        codes, rest = self.shift_tables
+        if prev_code not in codes.ids or next_code not in codes.ids:
             return True
-        p_t = self.shift_times(prev_code, prev_date)
-        n_t = self.shift_times(next_code, next_date)
-        if not p_t or not n_t: return True
-        return (n_t[0] - p_t[1]).total_seconds() / 3600.0 >= 16
+        return rest.ok(codes.ids[prev_code], codes.ids[next_code], (next_date - prev_date).days)
 
     def week_index(self, d):
-        first = d.replace(day=1)
-        first_monday = first - timedelta(days=first.weekday())
-        return (d - first_monday).days // 7
+        return week_index(d)
 
-    def _make_weekly_pref(self, weeks, employees):
+    def _make_weekly_pref(self, ctx, employees, rng, last_afternoons=None):
         weekly_pref = {}
+        last_afternoons = last_afternoons or {}
         
         rotation_1 = self.special_rotation 
         rotation_2 = self.special_rotation_2 
         
         all_special = set(rotation_1) | set(rotation_2)
+        employee_set = set(employees)
         normal_candidates = [e for e in employees if e not in all_special]
-        random.shuffle(normal_candidates)
+        rng.shuffle(normal_candidates)
+
+        # Kontynuacja rotacji z poprzedniego miesiąca: osoba z 12-20 kończy wspólny tydzień
+        # i idzie na koniec kolejki
+        last_12_20 = last_afternoons.get("12-20")
+        if last_12_20 in normal_candidates:
+            normal_candidates.remove(last_12_20)
+            normal_candidates.append(last_12_20)
 
         def get_next_afternoon_worker():
             idx = 0
@@ -78,11 +115,26 @@ class Scheduler:
                 idx += 1
 
         afternoon_gen = get_next_afternoon_worker()
-        sorted_weeks = sorted(weeks)
+        sorted_weeks = ctx.weeks
 
         # Sprawdzamy długość pierwszego tygodnia
-        first_week_days = [d for d in self.days if self.week_index(d) == sorted_weeks[0]]
-        work_days_in_first_week = len([d for d in first_week_days if d.weekday() < 5])
+        first_week_days = ctx.days_by_week[sorted_weeks[0]]
+        work_days_in_first_week = len([di for di in first_week_days if ctx.weekday[di] < 5])
+        # Miesiąc nie zaczyna się w poniedziałek: pierwszy tydzień to ten sam tydzień
+        # kalendarzowy co ostatni tydzień poprzedniego miesiąca
+        shared_first_week = ctx.weekday[0] != 0
+
+        # Przesunięcie rotacji: wspólny tydzień zostaje (niezależnie od liczby dni roboczych)
+        # przy osobie z ostatniego tygodnia poprzedniego miesiąca, inaczej zaczyna następna.
+        # Zwraca (przesunięcie, czy rotacja jest kontynuowana)
+        def rotation_offset(rotation, key):
+            last = last_afternoons.get(key)
+            if last not in rotation:
+                return 0, False
+            return rotation.index(last) + (0 if shared_first_week else 1), True
+
+        offset_1, continued_1 = rotation_offset(rotation_1, "14-22")
+        offset_2, continued_2 = rotation_offset(rotation_2, "13-21")
 
         for i, w in enumerate(sorted_weeks):
             weekly_pref[w] = {}
@@ -92,39 +144,43 @@ class Scheduler:
                 rot_idx = (i - 1) if i > 0 else 0
             else:
                 rot_idx = i
+            # Przy kontynuacji wspólny tydzień należy już do osoby z poprzedniego miesiąca,
+            # więc pierwszy pełny tydzień przechodzi na następną (bez podwójnego tygodnia)
 
             # --- 1. PRZYPISANIE GRUPY 2 (MAREK I INNI) - PIERWSZA KOLEJNOŚĆ ---
-            special_2_person = rotation_2[rot_idx % len(rotation_2)]
+            special_2_person = rotation_2[((i if continued_2 else rot_idx) + offset_2) % len(rotation_2)]
             for e in rotation_2:
-                if e in employees:
+                if e in employee_set:
                     # 13-21 dla wybranego, reszta 08-16
                     weekly_pref[w][e] = "13.00-21.00" if e == special_2_person else "08.00-16.00"
 
             # --- 2. PRZYPISANIE GRUPY 1 (BARBARA I INNI) ---
-            special_1_person = rotation_1[rot_idx % len(rotation_1)]
+            special_1_person = rotation_1[((i if continued_1 else rot_idx) + offset_1) % len(rotation_1)]
             for e in rotation_1:
-                if e in employees:
+                if e in employee_set:
                     weekly_pref[w][e] = "14.00-22.00" if e == special_1_person else "07.00-15.00"
 
             # --- 3. PRZYPISANIE GRUPY NORMALNEJ (TOMASZ I INNI) ---
-            worker_12_20 = next(afternoon_gen)
+            if i == 0 and shared_first_week and last_12_20 in normal_candidates:
+                worker_12_20 = last_12_20
+            else:
+                worker_12_20 = next(afternoon_gen)
             for e in normal_candidates:
-                if e in employees:
+                if e in employee_set:
                     weekly_pref[w][e] = "12.00-20.00" if e == worker_12_20 else "07.00-15.00"
                 
         return weekly_pref
 
-    def _assign_weekend_day(self, d, weekly_pref, week_of, schedule, hours, stats, 
-                            last_sun_day, last_hol_day, last_sat_day, assigned_today):
-        # 1. Definiujemy osoby, które MAJĄ ZAKAZ pracy w weekendy i święta
-        forbidden_employees = set(self.special_rotation_2) | set(self.special_rotation)
+    def _assign_weekend_day(self, ctx, di, schedule, weekend, assigned_today):
+        d = ctx.days[di]
+        weekday = ctx.weekday[di]
+        is_hol = ctx.is_holiday[di]
+        category = ctx.day_class[di]
+        ww = schedule.codes.ids["WW"]
+        rest_ids = schedule.codes.id_set(("OFF", "WN", "WS", "WP", "WH"))
         
-        weekday = d.weekday()
-        is_hol = d in polish_holidays(d.year)
-        
-        # Ustalamy numer tygodnia w miesiącu, aby wiedzieć czy dyżur jest 1- czy 2-osobowy
-        sorted_weeks = sorted(set(week_of.values()))
-        nth_week = sorted_weeks.index(week_of[d]) + 1
+        # Numer tygodnia w miesiącu decyduje, czy dyżur jest 1- czy 2-osobowy
+        nth_week = ctx.nth_week[di]
         
         # Logika obsady: Święta = 2 osoby, weekendy co drugi tydzień 2 osoby, inaczej 1 osoba
         if is_hol:
@@ -134,54 +190,24 @@ class Scheduler:
             num_workers = 1 if nth_week % 2 != 0 else 2
             forced_shift = "08.00-17.00" if (nth_week % 2 != 0) else None
 
-        scored_candidates = []
-        for e in schedule.keys():
-            # BLOKADA: Jeśli pracownik jest w grupie specjalnej 1 lub 2, pomiń go
-            if e in forbidden_employees:
-                continue
-            
+        # Osoby z grup specjalnych nie ma w kolejkach (zakaz pracy w weekendy i święta)
+        def eligible(ei):
             # Jeśli pracownik ma już przypisane coś na dziś (np. urlop WW)
-            if schedule[e].get(d) == "WW" or e in assigned_today:
-                continue
-            
+            if schedule.get_id(ei, di) == ww or ei in assigned_today:
+                return False
             # Blokada: Nie pracujemy w niedzielę, jeśli była pracująca sobota (zasada odpoczynku)
+            # (nieznaną sobotę spoza miesiąca traktujemy jak pracującą)
             if weekday == 6:
-                yesterday = d - timedelta(days=1)
-                if schedule[e].get(yesterday) not in ("OFF", "WN", "WS", "WP", "WH"):
-                    continue
-
-            # Wybór odpowiedniej pamięci i limitów dla punktacji
-            if is_hol:
-                last = last_hol_day.get(e)
-                limit = 10 
-                work_count = stats[e]["holidays"]
-            elif weekday == 6:
-                last = last_sun_day.get(e)
-                limit = 21 # Minimum 3 tygodnie odstępu dla niedziel
-                work_count = stats[e]["sundays"]
-            else: # Sobota
-                last = last_sat_day.get(e)
-                limit = 12
-                work_count = stats[e]["saturdays"]
-                
-            days_since = (d - last).days if last else 999
-            
-            # Punktacja (score): 
-            # (0, ...) - osoby, które odpoczywały powyżej limitu (priorytet)
-            # (1, ...) - osoby, które muszą wejść w kolejkę ratunkową
-            if days_since < limit:
-                score = (1, -days_since, work_count)
-            else:
-                score = (0, work_count, -days_since)
-
-            scored_candidates.append({"name": e, "score": score})
+                prev = schedule.get_id(ei, di - 1) if di > 0 else schedule.before[ei]
+                if prev not in rest_ids:
+                    return False
+            return True
 
-        # Sortowanie kandydatów według punktacji i wybór najlepszych
-        scored_candidates.sort(key=lambda x: x["score"])
-        picked = [c["name"] for c in scored_candidates[:num_workers]]
+        # Wybór najlepszych z kolejek (statystyki i daty ostatniej pracy aktualizuje kolejka)
+        picked = weekend.pick(category, d, num_workers, eligible)
         
         # Przypisywanie zmian wybranym osobom
-        for i, e in enumerate(picked):
+        for i, ei in enumerate(picked):
             # Ustalanie kodu zmiany (08-17 lub rano/popołudnie)
             shift = forced_shift if forced_shift else ("07.00-15.00" if i == 0 else "14.00-22.00")
             
@@ -189,269 +215,479 @@ class Scheduler:
             if is_hol and shift == "08.00-17.00": 
                 shift = "07.00-15.00"
 
-            schedule[e][d] = shift
-            hours[e] += self.SHIFTS[shift][2]
-            
-            # Aktualizacja statystyk i dat ostatniej pracy
-            if is_hol:
-                stats[e]["holidays"] += 1
-                last_hol_day[e] = d
-            elif weekday == 6:
-                stats[e]["sundays"] += 1
-                last_sun_day[e] = d
-            elif weekday == 5:
-                stats[e]["saturdays"] += 1
-                last_sat_day[e] = d
-                
-            assigned_today.add(e)
-
-    def _assign_weekday(self, d, weekly_pref, week_of, schedule, hours, stats):
-        w = week_of[d]
-        prev = d - timedelta(days=1)
+            schedule.set(ei, di, shift)
+            assigned_today.add(ei)
+
+    def _assign_weekday(self, ctx, di, weekly_pref, schedule, stats):
+        """Zwraca liczbę sprawdzeń zasady odpoczynku (licznik dla profilera)."""
+        w = ctx.week_of[di]
+        codes = schedule.codes
+        ids = codes.ids
+        off, ww = ids["OFF"], ids["WW"]
+        pm_14_22, pm_12_20 = ids["14.00-22.00"], ids["12.00-20.00"]
+
+        # Przejścia z dnia poprzedniego (odstęp 1 dnia); nieznany dzień spoza miesiąca = OFF
+        allowed = self.rest_table.allowed[1]
+        n = len(codes)
+
+        def prev_row(ei):
+            if di > 0:
+                return schedule.get_id(ei, di - 1) * n
+            prev = schedule.before[ei]
+            return (off if prev is None else prev) * n
         
         # 1. Najpierw definiujemy listę pracowników na popołudnie
-        pm_workers = [e for e in schedule.keys() if weekly_pref[w][e] in ("14.00-22.00", "12.00-20.00", "13.00-21.00")]        
+        pm_workers = [ei for ei, e in enumerate(schedule.employees) if weekly_pref[w][e] in ("14.00-22.00", "12.00-20.00", "13.00-21.00")]
         
         # 2. Teraz sprawdzamy urlopy i przypisujemy zmiany
-        for e in pm_workers:
-            if schedule[e].get(d) == "WW": 
+        checks = 0
+        for ei in pm_workers:
+            if schedule.get_id(ei, di) == ww:
                 continue # Pomiń jeśli ma urlop
                 
-            pref = weekly_pref[w][e]
-            if self.rest_ok(schedule[e].get(prev, "OFF"), prev, pref, d):
-                schedule[e][d] = pref
-                hours[e] += 8
+            pref = ids[weekly_pref[w][schedule.employees[ei]]]
+            checks += 1
+            if allowed[prev_row(ei) + pref]:
+                schedule.set_id(ei, di, pref)
 
         # 2. Reszta (w tym ci po niedzieli)
-        for e in schedule.keys():
-            if schedule[e][d] != "OFF": continue
+        for ei, e in enumerate(schedule.employees):
+            if schedule.get_id(ei, di) != off: continue
             
-            target = weekly_pref[w][e]
-            prev_shift = schedule[e].get(prev, "OFF")
+            target = ids[weekly_pref[w][e]]
+            p = prev_row(ei)
 
-            if self.rest_ok(prev_shift, prev, target, d):
-                schedule[e][d] = target
-                hours[e] += 8
+            checks += 1
+            if allowed[p + target]:
+                schedule.set_id(ei, di, target)
             else:
                 # Jeśli po weekendzie nie może przyjść rano, wymuszamy popołudnie.
                 # Zamiast tracić dzień (WN), wstawiamy go na 14.00-22.00 lub 12.00-20.00.
-                if self.rest_ok(prev_shift, prev, "14.00-22.00", d):
-                    schedule[e][d] = "14.00-22.00"
-                    hours[e] += 8
+                checks += 1
+                if allowed[p + pm_14_22]:
+                    schedule.set_id(ei, di, pm_14_22)
                 else:
-                    schedule[e][d] = "12.00-20.00"
-                    hours[e] += 8
-
-    def _assign_compensatory(self, employees, days, schedule, hours, week_of, last_sunhol_day):
-        """Poprawione odbiory: nie zabierają dni roboczych, jeśli ktoś ma mało godzin."""
-        holidays = set(polish_holidays(days[0].year))
-        workdays = [d for d in days if d.weekday() < 5 and d not in holidays]
-        day_load = Counter()
+                    schedule.set_id(ei, di, pm_12_20)
+        return checks
+
+    def _assign_compensatory(self, ctx, schedule, last_sunhol_day, rng, coverage=None):
+        """Poprawione odbiory: nie zabierają dni roboczych, jeśli ktoś ma mało godzin.
+
+        Zwraca (liczba przejrzanych dni-kandydatów, liczba wstawionych odbiorów).
+        Z coverage spośród równie obciążonych dni najpierw brane są te, których zmiana
+        łamie odpoczynek z sąsiednim dniem (odbiór to naprawia), a dopiero wśród nich
+        ten, w którym zabranie zmiany najmniej psuje pokrycie zapotrzebowania.
+        """
+        codes = schedule.codes
+        earning = codes.id_set(("07.00-15.00", "14.00-22.00", "08.00-17.00"))
+        swappable = codes.id_set(("07.00-15.00", "14.00-22.00"))
+        wn, ws, wp = codes.ids["WN"], codes.ids["WS"], codes.ids["WP"]
+        allowed, n = self.rest_table.allowed[1], len(codes)
+
+        def rest_broken(ei, di):
+            cur = schedule.get_id(ei, di)
+            prev = schedule.get_id(ei, di - 1) if di > 0 else schedule.before[ei]
+            nxt = schedule.get_id(ei, di + 1) if di + 1 < schedule.ndays else None
+            return ((prev is not None and not allowed[prev * n + cur])
+                    or (nxt is not None and not allowed[cur * n + nxt]))
+
+        # Wspólna dla wszystkich liczba odbiorów w danym dniu (indeks dnia -> liczba)
+        day_load = [0] * len(ctx.days)
 
         # Sortujemy pracowników tak, by ci z największą liczbą godzin pierwsi dostawali odbiory
-        sorted_emp = sorted(employees, key=lambda x: hours[x], reverse=True)
-
-        for e in sorted_emp:
-            for d in days:
-                # Jeśli w dany dzień pracownik ma WW, to nie wypracował w nim odbioru!
-                if schedule[e].get(d) == "WW": continue
-
-                shift = schedule[e].get(d)
-                if shift not in ("07.00-15.00", "14.00-22.00", "08.00-17.00"): continue
-                
-                comp = "WN" if d.weekday() == 6 else ("WS" if d in holidays else ("WP" if d.weekday() == 5 else None))
-                if not comp: continue
-
-                # Szukamy dnia do odbioru (musi mieć wpisaną zmianę roboczą 07.00-15.00 lub 14.00-22.00)
-                possible = [wd for wd in workdays if abs((wd - d).days) <= 7 
-                            and schedule[e][wd] in ("07.00-15.00", "14.00-22.00")
-                            and schedule[e][wd] != "WW"] # Nie zabieraj dnia, który już jest urlopem!
-                
-                if possible:
-                    # Wybieramy dzień tak, by nie było za dużo odbiorów naraz w biurze
-                    possible.sort(key=lambda wd: (day_load[wd], random.random()))
-                    cd = possible[0]
-                    # Zamieniamy pracę na odbiór (godziny spadają)
-                    old_shift_hrs = self.SHIFTS[schedule[e][cd]][2]
-                    schedule[e][cd] = comp
-                    hours[e] -= old_shift_hrs
-                    day_load[cd] += 1
-
-    def _adjust_last_day_hours(self, days, schedule, hours, target_hours=160):
-        for e in schedule:
-            diff = target_hours - hours[e]
+        sorted_emp = sorted(range(len(schedule.employees)), key=schedule.row_hours, reverse=True)
+        searched = placed = 0
+
+        for ei in sorted_emp:
+            row = schedule.row_ids(ei)
+            # WW i dni bez zmiany weekendowej nie dają odbioru
+            duties = [di for di in ctx.duty_idx if row[di] in earning]
+            if not duties: continue
+
+            # Indeks dni do odbioru: posortowane dni robocze ze zmianą 07.00-15.00 lub 14.00-22.00
+            # (dzień z urlopem WW nigdy nie zostanie zabrany); wykorzystane dni wypadają z indeksu
+            swap_days = [wd for wd in ctx.workday_idx if row[wd] in swappable]
+
+            for di in duties:
+                # Niedziela ma pierwszeństwo przed świętem, święto przed sobotą
+                comp = wn if ctx.weekday[di] == 6 else (ws if ctx.is_holiday[di] else wp)
+
+                # Okno +-7 dni wyszukiwane binarnie w indeksie
+                lo = bisect_left(swap_days, di - 7)
+                hi = bisect_right(swap_days, di + 7)
+                if lo == hi: continue
+                searched += hi - lo
+
+                # Wybieramy dzień tak, by nie było za dużo odbiorów naraz w biurze;
+                # remis rozstrzyga jedno losowanie z generatora (powtarzalne dla seeda)
+                low = min(day_load[wd] for wd in swap_days[lo:hi])
+                best = [k for k in range(lo, hi) if day_load[swap_days[k]] == low]
+                if coverage is not None and len(best) > 1:
+                    # Pokrycie nie może wygrać z odpoczynkiem - decyduje tylko o remisach
+                    best = [k for k in best if rest_broken(ei, swap_days[k])] or best
+                    cost = {k: coverage.delta(swap_days[k], row[swap_days[k]], comp) for k in best}
+                    least = min(cost.values())
+                    best = [k for k in best if cost[k] == least]
+                k = best[0] if len(best) == 1 else rng.choice(best)
+                cd = swap_days.pop(k)
+
+                # Zamieniamy pracę na odbiór (godziny spadają razem z kodem)
+                schedule.set_id(ei, cd, comp)
+                day_load[cd] += 1
+                placed += 1
+        return searched, placed
+
+    def _adjust_last_day_hours(self, ctx, schedule, target_hours=TARGET_HOURS, rows=None, coverage=None):
+        """Zwraca (poprawieni, cofnięcia na wcześniejszy dzień, pozostali z odchyłką).
+
+        rows ogranicza korektę do podanych wierszy (przeplanowanie przyrostowe),
+        coverage (Coverage z zapotrzebowaniem) kieruje korektę w godziny z brakami.
+        """
+        adjusted = fallbacks = missed = 0
+        for ei in range(len(schedule.employees)) if rows is None else rows:
+            diff = target_hours - schedule.row_hours(ei)
             if diff == 0: continue
+
+            # Z histogramem obsady wybieramy spośród wszystkich pasujących dni ten, który
+            # najlepiej łata braki (remis: najpóźniejszy, jak bez histogramu); zmieniony dzień
+            # nie może łamać odpoczynku z sąsiednimi
+            if coverage is not None:
+                ids, n = schedule.codes.ids, len(schedule.codes)
+                allowed = self.rest_table.allowed[1]
+                options = []
+                for di in reversed(ctx.workday_idx):
+                    current = schedule.code(ei, di)
+                    if "-" in current:
+                        new_code = self._adjusted_code(current, diff)
+                        new = ids[new_code] if new_code is not None else None
+                        prev = schedule.get_id(ei, di - 1) if di > 0 else schedule.before[ei]
+                        nxt = schedule.get_id(ei, di + 1) if di + 1 < schedule.ndays else None
+                        if (new is None or (prev is not None and not allowed[prev * n + new])
+                                or (nxt is not None and not allowed[new * n + nxt])):
+                            fallbacks += 1
+                        else:
+                            options.append((coverage.delta(di, ids[current], new), len(options), di, new_code))
+                if options:
+                    _, _, di, new_code = min(options)
+                    schedule.set(ei, di, new_code)
+                    adjusted += 1
+                else:
+                    missed += 1
+                continue
             
             # Szukamy ostatniego dnia roboczego (gdzie jest zmiana z "-" np. 07.00-15.00)
-            for d in reversed(days):
-                current = schedule[e][d]
-                # Sprawdzamy czy to dzień roboczy i czy ma w nazwie kreskę (kod zmiany)
-                if d.weekday() < 5 and d not in polish_holidays(d.year) and "-" in current:
-                    try:
-                        # split('-')[0] daje nam "14.00"
-                        # split('.')[0] wyciąga z tego samo "14"
-                        sh_str = current.split('-')[0].split('.')[0]
-                        sh = int(sh_str)
-                        
-                        current_hrs = self.SHIFTS[current][2]
-                        new_hrs = current_hrs + diff
-                        
-                        if 0 < new_hrs <= 8:
-                            new_eh = sh + new_hrs
-                            # Tworzymy nowy kod w Twoim formacie: "14.00-20.00"
-                            new_code = f"{sh:02d}.00-{int(new_eh):02d}.00"
-                            
-                            if new_code in self.SHIFTS:
-                                schedule[e][d] = new_code
-                                hours[e] += diff
-                                break
-                    except (ValueError, IndexError):
-                        continue # Jeśli coś pójdzie nie tak z formatem, szukaj innego dnia
-
-    def generate(self, year, month, employees=None, initial_stats=None, last_weekend_workers=None, leaves=None):
-        self.days = month_days(year, month)
+            for di in reversed(ctx.workday_idx):
+                current = schedule.code(ei, di)
+                # Dzień roboczy z kreską w nazwie (kod zmiany)
+                if "-" in current:
+                    new_code = self._adjusted_code(current, diff)
+                    if new_code is not None:
+                        schedule.set(ei, di, new_code)
+                        adjusted += 1
+                        break
+                    # Ten dzień się nie nadał - cofamy się na wcześniejszy
+                    fallbacks += 1
+            else:
+                missed += 1
+        return adjusted, fallbacks, missed
+
+    def _adjusted_code(self, current, diff):
+        """Kod zmiany current skróconej/wydłużonej o diff godzin (ten sam start) albo None."""
+        try:
+            # split('-')[0] daje nam "14.00"
+            # split('.')[0] wyciąga z tego samo "14"
+            sh_str = current.split('-')[0].split('.')[0]
+            sh = int(sh_str)
+
+            current_hrs = self.SHIFTS[current][2]
+            new_hrs = current_hrs + diff
+
+            if 0 < new_hrs <= 8:
+                new_eh = sh + new_hrs
+                # Tworzymy nowy kod w Twoim formacie: "14.00-20.00"
+                new_code = f"{sh:02d}.00-{int(new_eh):02d}.00"
+
+                if new_code in self.SHIFTS:
+                    return new_code
+        except (ValueError, IndexError):
+            pass # Jeśli coś pójdzie nie tak z formatem, szukaj innego dnia
+        return None
+
+    def _summary(self, ctx, schedule, base_stats):
+        # Redukcje po wierszach macierzy: godziny i przepracowane dni danej klasy w tym miesiącu
+        sat_idx, sun_idx, hol_idx = ctx.saturday_idx, ctx.sunday_idx, ctx.holiday_idx
+        summary = []
+        for ei, e in enumerate(schedule.employees):
+            summary.append({
+                "employee": e, 
+                "hours": schedule.row_hours(ei), 
+                "saturdays": base_stats[e]["saturdays"] + schedule.worked_count(ei, sat_idx), 
+                "sundays": base_stats[e]["sundays"] + schedule.worked_count(ei, sun_idx), 
+                "holidays": base_stats[e]["holidays"] + schedule.worked_count(ei, hol_idx)
+            })
+        return summary
+
+    def generate(self, year, month, employees=None, initial_stats=None, last_weekend_workers=None, leaves=None,
+                 last_week_afternoons=None, optimize_seconds=0, report=None, rng=None, ledger=None):
+        state = ScheduleState.initial(date(year, month, 1), initial_stats, last_weekend_workers, last_week_afternoons)
+        schedule, summary, holidays, _ = self.generate_month(year, month, state, employees, leaves,
+                                                             optimize_seconds, report, rng, ledger)
+        return schedule, summary, holidays
+
+    def generate_month(self, year, month, state, employees=None, leaves=None, optimize_seconds=0, report=None, rng=None,
+                       ledger=None, weekly_pref=None):
+        """Generuje miesiąc na podstawie stanu i zwraca też stan dla kolejnego miesiąca.
+
+        optimize_seconds > 0 uruchamia po fazach zachłannych optymalizację lokalną
+        z takim limitem czasu; jej wynik trafia do słownika report["optimize"].
+        Jeśli podano report, czasy faz trafiają do report["phases"] (w sekundach),
+        liczniki gorących ścieżek do report["counters"], a wynik walidacji
+        gotowego grafiku do report["validation"], a z coverage_demand braki
+        i nadmiary obsady do report["coverage"].
+
+        Cały stan wywołania jest lokalny (kalendarz, macierz, generator), więc
+        metoda jest wielowejściowa. rng (random.Random) pozwala współbieżnym
+        wywołaniom na jednej instancji losować niezależnie; domyślnie self.rng.
+
+        Z ledger (Ledger) stan przed miesiącem jest brany z bazy historii, jeśli ma ona
+        wcześniejsze miesiące (inaczej z state), a gotowy miesiąc jest do niej dopisywany.
+
+        weekly_pref pozwala podać policzone wcześniej preferencje tygodniowe (np. wspólne
+        dla wariantów w scenarios.py); rng musi wtedy kontynuować losowanie sprzed nich.
+        """
+        ctx = calendar_context(year, month)
+        days = ctx.days
+        if rng is None:
+            rng = self.rng
+        if ledger is not None:
+            with phase(report, "ledger"):
+                state = ledger.state(days[0]) or state
         if employees is None:
                     employees = self.employees 
-        holidays = set(polish_holidays(year))
-        schedule = {e: {d: "OFF" for d in self.days} for e in employees}
+        holidays = ctx.holidays
+        schedule = ScheduleMatrix(employees, days, self.shift_tables[0])
+        # Zmiany z ostatniego dnia poprzedniego miesiąca (None = nieznana)
+        schedule.before = [schedule.codes.ids.get(state.last_shifts.get(e)) for e in employees]
+        # Histogram obsady śledzi każdą wstawianą zmianę i steruje odbiorami oraz korektą godzin
+        coverage = None
+        if self.coverage_demand is not None:
+            coverage = Coverage(schedule, self.coverage_table, self.coverage_demand).attach()
 
         # --- NOWA LOGIKA: WPISYWANIE URLOPÓW NA START ---
         if leaves:
             for emp_name, days_off in leaves.items():
                 if emp_name in schedule:
                     for d_num in days_off:
-                        # Znajdujemy konkretną datę w self.days
+                        # Znajdujemy konkretną datę w days
                         target_date = date(year, month, d_num)
-                        if target_date in schedule[emp_name]:
-                            schedule[emp_name][target_date] = "WW"
+                        if target_date in schedule.day_index:
+                            schedule.set(schedule.emp_index[emp_name], schedule.day_index[target_date], "WW")
 
-        hours = {e: 0 for e in employees}
-        week_of = {d: self.week_index(d) for d in self.days}
-        
-        stats = {e: (initial_stats[e].copy() if initial_stats and e in initial_stats else {"saturdays":0, "sundays":0, "holidays":0}) for e in employees}
+        base_stats = {e: state.stats_for(e) for e in employees}
+        stats = {e: base_stats[e].copy() for e in employees}
 
         # --- 1. INICJALIZACJA TRZECH OSOBNYCH KOLEJEK ---
-        # Data "daleka" (40 dni wstecz), żeby system nie blokował nikogo na starcie bez powodu
-        far_past = self.days[0] - timedelta(days=40)
-        # Data "niedzielna" (1 dzień wstecz), żeby zablokować konkretne osoby
-        last_sunday_of_april = self.days[0] - timedelta(days=1) 
-
-        last_sun_day = {}
-        for e in employees:
-            if last_weekend_workers and e in last_weekend_workers:
-                # Jeśli był w ostatni weekend, wpisujemy mu ostatnią niedzielę kwietnia
-                # To go zablokuje w niedzielach na 21 dni od tej daty
-                last_sun_day[e] = last_sunday_of_april
-            else:
-                last_sun_day[e] = far_past
-
-        # Święta i soboty startują z "czystym kontem" dla wszystkich
-        last_hol_day = {e: far_past for e in employees}
-        last_sat_day = {e: far_past for e in employees}
-
-        weekly_pref = self._make_weekly_pref(set(week_of.values()), employees)
+        # Data "daleka" (40 dni wstecz), żeby system nie blokował nikogo na starcie bez powodu;
+        # osoby z ostatniego weekendu mają w stanie niedzielę sprzed miesiąca
+        far_past = days[0] - timedelta(days=40)
+        last_sun_day = {e: state.last_day(SUNDAY, e, far_past) for e in employees}
+        last_hol_day = {e: state.last_day(HOLIDAY, e, far_past) for e in employees}
+        last_sat_day = {e: state.last_day(SATURDAY, e, far_past) for e in employees}
+        # Kolejki nadpisują te daty dyżurami z miesiąca - optymalizacja dostaje kopię sprzed niego
+        prev_days = {HOLIDAY: dict(last_hol_day), SUNDAY: dict(last_sun_day), SATURDAY: dict(last_sat_day)}
+
+        if weekly_pref is None:
+            with phase(report, "weekly_pref"):
+                weekly_pref = self._make_weekly_pref(ctx, employees, rng, state.afternoons)
 
         # --- 2. GENEROWANIE GRAFIKU (WEEKENDY I ŚWIĘTA) ---
-        assigned_today = defaultdict(set)
-        for d in self.days:
-            if d.weekday() in (5, 6) or d in holidays:
-                # Przekazujemy wszystkie 3 słowniki do funkcji przypisującej
-                self._assign_weekend_day(
-                    d, weekly_pref, week_of, schedule, hours, stats, 
-                    last_sun_day, last_hol_day, last_sat_day, assigned_today[d]
-                )
+        # Kolejki dostają wszystkie 3 słowniki i aktualizują je w miejscu
+        forbidden_employees = set(self.special_rotation_2) | set(self.special_rotation)
+        weekend = WeekendAllocator(
+            schedule.employees,
+            [ei for ei, e in enumerate(schedule.employees) if e not in forbidden_employees],
+            stats,
+            {HOLIDAY: last_hol_day, SUNDAY: last_sun_day, SATURDAY: last_sat_day},
+        )
+        with phase(report, "weekend"):
+            for di in ctx.duty_idx:
+                self._assign_weekend_day(ctx, di, schedule, weekend, set())
         
         # --- 3. DNI ROBOCZE I ODBIORY ---
-        for d in self.days:
-            if d.weekday() < 5 and d not in holidays: 
-                self._assign_weekday(d, weekly_pref, week_of, schedule, hours, stats)
+        rest_checks = 0
+        with phase(report, "weekday"):
+            for di in ctx.workday_idx:
+                rest_checks += self._assign_weekday(ctx, di, weekly_pref, schedule, stats)
         
         # Odbiorami zajmujemy się na końcu (używamy last_sun_day jako bazy)
-        self._assign_compensatory(employees, self.days, schedule, hours, week_of, last_sun_day)
-        self._adjust_last_day_hours(self.days, schedule, hours)
+        with phase(report, "compensatory"):
+            comp_searched, comp_placed = self._assign_compensatory(ctx, schedule, last_sun_day, rng, coverage)
+        with phase(report, "adjust_hours"):
+            adjusted, fallbacks, missed = self._adjust_last_day_hours(ctx, schedule, coverage=coverage)
+
+        count(report, rest_checks=rest_checks, weekend_candidates_scored=weekend.scored,
+              comp_days_searched=comp_searched, comp_days_placed=comp_placed,
+              hours_adjusted=adjusted, hours_adjust_fallbacks=fallbacks, hours_unadjusted=missed)
+
+        # Opcjonalna poprawa grafiku w limicie czasu (przegląda decyzje faz zachłannych)
+        if optimize_seconds and optimize_seconds > 0:
+            with phase(report, "optimize"):
+                search = LocalSearch(ctx, schedule, base_stats, self.rest_table, forbidden_employees, TARGET_HOURS,
+                                     rng=rng, last_days=prev_days)
+                result = search.run(optimize_seconds)
+            if report is not None:
+                report["optimize"] = result
 
         # --- 4. PODSUMOWANIE ---
-        summary = []
-        for e in employees:
-            act_h = sum(self.SHIFTS.get(schedule[e][d], (0,0,0))[2] for d in self.days if schedule[e][d] not in ("WN","WS","WP","WH","OFF","WW"))
-            summary.append({
-                "employee": e, 
-                "hours": act_h, 
-                "saturdays": stats[e]["saturdays"], 
-                "sundays": stats[e]["sundays"], 
-                "holidays": stats[e]["holidays"]
-            })
-            
-        return schedule, summary, holidays
+        summary = self._summary(ctx, schedule, base_stats)
+
+        # Kontrola po generowaniu tym samym walidatorem co audyt archiwum (tylko z raportem)
+        if report is not None:
+            with phase(report, "validate"):
+                report["validation"] = report_dict(Validator(self).check(schedule, state))
+        if coverage is not None:
+            if report is not None:
+                report["coverage"] = coverage.report()
+            coverage.detach()
+        sat_idx, sun_idx, hol_idx = ctx.saturday_idx, ctx.sunday_idx, ctx.holiday_idx
+
+        # --- 5. STAN NA KOLEJNY MIESIĄC ---
+        # Liczniki i daty ostatnich dyżurów bierzemy z macierzy (po ewentualnej optymalizacji);
+        # tygodnie rotacji popołudniowych liczymy z preferencji tygodniowych (ctx.counted_weeks)
+        next_stats = {e: s.copy() for e, s in state.stats.items()}
+        for s_row in summary:
+            e = s_row["employee"]
+            next_stats[e] = dict(base_stats[e], saturdays=s_row["saturdays"], sundays=s_row["sundays"],
+                                 holidays=s_row["holidays"])
+            for key, code in (("weeks_12_20", "12.00-20.00"), ("weeks_14_22", "14.00-22.00")):
+                weeks = sum(1 for w in ctx.counted_weeks if weekly_pref[w].get(e) == code)
+                next_stats[e][key] = next_stats[e].get(key, 0) + weeks
+
+        last_days = {c: dict(state.last_days[c]) for c in state.last_days}
+        for cat, idx in ((SATURDAY, sat_idx), (SUNDAY, sun_idx), (HOLIDAY, hol_idx)):
+            for ei, e in enumerate(employees):
+                worked = [di for di in idx if schedule.hours[ei * schedule.ndays + di]]
+                if worked:
+                    last_days[cat][e] = days[worked[-1]]
+
+        afternoons = dict(state.afternoons)
+        last_week = weekly_pref[ctx.weeks[-1]]
+        for key, code in AFTERNOON_CODES.items():
+            for e in employees:
+                if last_week.get(e) == code:
+                    afternoons[key] = e
+
+        last_shifts = dict(state.last_shifts)
+        last_shifts.update((e, schedule.code(ei, len(days) - 1)) for ei, e in enumerate(employees))
+
+        next_state = ScheduleState(next_stats, last_days, afternoons, last_shifts, f"{year}-{month:02d}")
+        if ledger is not None:
+            with phase(report, "ledger"):
+                ledger.record(schedule, weekly_pref, state)
+        return schedule, summary, holidays, next_state
+
+    def replan(self, schedule, changes, state=None, rng=None, report=None):
+        """Przeplanowanie istniejącego grafiku po zmianach (urlop, L4, nowy/usunięty pracownik).
+
+        Zmienia tylko dotknięte okno zamiast generować miesiąc od nowa - patrz replan.replan.
+        """
+        from .replan import replan
+        return replan(self, schedule, changes, state, rng, report)
 
     def save_xlsx(self, schedule, summary, holidays, year, month, filename):
-        wb = Workbook(); ws = wb.active; ws.title = f"{calendar.month_name[month]}_{year}"
-        border = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"), bottom=Side(style="thin"))
-        center = Alignment(horizontal="center", vertical="center"); bold = Font(bold=True)
-        sat_f = PatternFill("solid", fgColor=self.COLORS["saturday"]); sun_f = PatternFill("solid", fgColor=self.COLORS["sunday"])
-        hol_f = PatternFill("solid", fgColor=self.COLORS["holiday"]); odb_f = PatternFill("solid", fgColor=self.COLORS["odbior"])
-
-        ws.cell(1, 1, "Pracownik").font = bold; ws.cell(1, 2, "Typ danych").font = bold
-        for i, d in enumerate(self.days):
-            c = 3 + i; ws.cell(1, c, d.day).font = bold
-            ws.cell(2, c, calendar.day_name[d.weekday()][:2]).font = bold
-            if d in holidays: ws.cell(1, c).fill = hol_f; ws.cell(2, c).fill = hol_f
-            elif d.weekday() == 5: ws.cell(1, c).fill = sat_f; ws.cell(2, c).fill = sat_f
-            elif d.weekday() == 6: ws.cell(1, c).fill = sun_f; ws.cell(2, c).fill = sun_f
-
-        row = 3
-        for e in schedule:
-            ws.cell(row, 1, e).font = bold; ws.cell(row, 2, "Godziny"); ws.cell(row+1, 2, "Liczba h")
-            for i, d in enumerate(self.days):
-                c = 3 + i; val = schedule[e][d]
-                cell_code = ws.cell(row, c, val); cell_code.alignment = center; cell_code.border = border
-                if val in ("WN", "WS", "WP", "WH", "WW"): cell_code.fill = odb_f
-                elif d in holidays: cell_code.fill = hol_f
-                elif d.weekday() == 5: cell_code.fill = sat_f
-                elif d.weekday() == 6: cell_code.fill = sun_f
-                
-                h_val = self.SHIFTS.get(val, (0,0,0))[2] if val not in ("WN","WS","WP","WH","OFF") else 0
-                cell_h = ws.cell(row+1, c, h_val); cell_h.alignment = center; cell_h.border = border
-            row += 2
-
-        row += 1; ws.cell(row, 1, "PODSUMOWANIE").font = bold; row += 1
-        ws.cell(row, 1, "Pracownik").font = bold; ws.cell(row, 2, "Suma h").font = bold
-        ws.cell(row, 3, "Soboty").font = bold; ws.cell(row, 4, "Niedziele").font = bold; ws.cell(row, 5, "Święta").font = bold
-        row += 1
-        for s in summary:
-            ws.cell(row, 1, s["employee"]); ws.cell(row, 2, s["hours"])
-            ws.cell(row, 3, s["saturdays"]); ws.cell(row, 4, s["sundays"]); ws.cell(row, 5, s["holidays"])
-            row += 1
-
-        # --- DODAJ TO TUTAJ ---
-        for col_idx in range(1, 3 + len(self.days)):
-            col_letter = ws.cell(1, col_idx).column_letter
-            # Kolumna 1 i 2 (Pracownik i Typ) potrzebują więcej miejsca
-            if col_idx == 1:
-                ws.column_dimensions[col_letter].width = 10.72  # Pracownik (trochę szerszy)
-            elif col_idx == 2:
-                ws.column_dimensions[col_letter].width = 10.5  # Typ danych
-            else:
-                # Wartość 13.43 w Excelu odpowiada zazwyczaj dokładnie 120 pikselom
-                ws.column_dimensions[col_letter].width = 10.3
-
-        wb.save(filename)
+        # Zapis strumieniowy: style nazwane rejestrowane raz, wiersze dopisywane po kolei.
+        # openpyxl ładujemy dopiero tutaj, żeby samo generowanie startowało szybko
+        from .xlsx import export
+        export(self, schedule, summary, holidays, year, month, filename)
+
+    def generate_and_save(self, year, month, employees=None, out_filename=None, initial_stats=None, last_weekend_workers=None, leaves=None,
+                          last_week_afternoons=None, candidates=1, workers=None, optimize_seconds=0,
+                          fmt="xlsx", dry_run=False, report=None, cache=None, ledger=None):
+        # report (opcjonalny słownik) zbiera czasy faz, liczniki i wyniki kandydatów dla --profile,
+        # cache (ResultCache) pozwala pominąć generowanie i zapis, jeśli wynik się nie zmienił,
+        # ledger (Ledger) daje stan z historii i dostaje wygenerowany miesiąc
+        if employees is None:
+            employees = self.employees
+        if ledger is not None and candidates > 1:
+            raise ValueError("ledger nie jest obsługiwany razem z wieloma kandydatami")
+        key = entry = None
+        # Wynik jest powtarzalny tylko ze stałym seedem i bez optymalizacji ograniczonej czasem;
+        # z ledgerem zależy też od zawartości bazy, więc cache nie jest używany
+        if cache is not None and ledger is None and self.seed is not None and not optimize_seconds:
+            key = result_key(year=year, month=month, seed=self.seed, candidates=candidates, employees=employees,
+                             initial_stats=initial_stats, last_weekend_workers=last_weekend_workers, leaves=leaves,
+                             last_week_afternoons=last_week_afternoons, shifts=sorted(self.SHIFTS.items()),
+                             min_rest=self.MIN_REST_HOURS, target_hours=TARGET_HOURS,
+                             rotations=[self.special_rotation, self.special_rotation_2],
+                             coverage_demand=self.coverage_demand)
+            entry = cache.get(key)
+            count(report, cache_hits=entry is not None, cache_misses=entry is None)
 
-    def generate_and_save(self, year, month, employees=None, out_filename=None, initial_stats=None, last_weekend_workers=None, leaves=None):
         # 1. Generujemy dane grafiku (tutaj przekazujemy leaves dalej)
-        sched, summ, hol = self.generate(year, month, employees, initial_stats, last_weekend_workers, leaves)
+        if entry is not None:
+            print(f"Wynik z cache ({key[:12]})")
+            sched, summ, hol = entry["result"]
+        elif candidates > 1:
+            # Tryb wyszukiwania: N kandydatów na kolejnych seedach, zapisujemy tylko najlepszego
+            from .search import candidate_seeds, search_candidates
+            seeds = candidate_seeds(candidates, self.seed)
+            best, results = search_candidates(year, month, seeds, workers, employees, initial_stats, last_weekend_workers, leaves,
+                                              last_week_afternoons=last_week_afternoons, optimize_seconds=optimize_seconds,
+                                              scheduler=self)
+            for r in results:
+                print(f"Kandydat seed={r['seed']}: wynik {r['score']:.2f}")
+            if report is not None:
+                report["candidates"] = [{"seed": r["seed"], "score": r["score"]} for r in results]
+            print(f"Najlepszy seed: {best['seed']} (wynik {best['score']:.2f})")
+            sched, summ, hol = best["schedule"], best["summary"], best["holidays"]
+        else:
+            if report is None:
+                report = {}
+            sched, summ, hol = self.generate(year, month, employees, initial_stats, last_weekend_workers, leaves, last_week_afternoons,
+                                             optimize_seconds, report, ledger=ledger)
+            if "optimize" in report:
+                opt = report["optimize"]
+                print(f"Optymalizacja: cel {opt['before']:.2f} -> {opt['after']:.2f} "
+                      f"({opt['accepted']}/{opt['iterations']} ruchów, {opt['seconds']} s)")
+            if "coverage" in report:
+                cov = report["coverage"]
+                print(f"Pokrycie: brak {cov['under']} osobogodzin, nadmiar {cov['over']} osobogodzin")
+            val = report["validation"]
+            if val["errors"]:
+                print(f"Uwaga: walidacja znalazła {val['errors']} naruszeń zasad: "
+                      + ", ".join(f"{v['rule']} {v['employee']} {v['day']}" for v in val["violations"] if v["severity"] == "error"))
+        if key is not None and entry is None:
+            entry = {"result": (sched, summ, hol), "outputs": {}}
+            cache.put(key, entry)
+
+        # Tryb próbny: tylko tabela podsumowania, bez ładowania żadnego eksportera
+        if dry_run:
+            print(summary_table(summ))
+            return
+
+        # Ten sam wynik był już zapisany w tym formacie i plik nadal istnieje - nie renderujemy ponownie
+        previous = entry["outputs"].get(fmt) if entry is not None else None
+        if previous and os.path.exists(previous) and (out_filename is None or os.path.abspath(out_filename) == previous):
+            print(f"Bez zmian: {os.path.relpath(previous)} jest aktualny")
+            return
+
+        exporter, export = get_exporter(fmt)
 
         # 2. Logika unikalnej nazwy pliku
         if out_filename is None:
             base_name = f"harm_{year}_{month:02d}"
-            out_filename = f"{base_name}.xlsx"
+            out_filename = f"{base_name}{exporter.extension}"
             
             # Jeśli plik istnieje, dodajemy _v1, _v2, itd.
             version = 1
             while os.path.exists(out_filename):
-                out_filename = f"{base_name}_v{version}.xlsx"
+                out_filename = f"{base_name}_v{version}{exporter.extension}"
                 version += 1
         
-        # 3. Zapis do Excela
-        self.save_xlsx(sched, summ, hol, year, month, out_filename)
+        # 3. Zapis w wybranym formacie
+        with phase(report, "export"):
+            export(self, sched, summ, hol, year, month, out_filename)
         print(f"Sukces! Grafik zapisany jako: {out_filename}")
+        if entry is not None:
+            entry["outputs"][fmt] = os.path.abspath(out_filename)
+            cache.put(key, entry)
@@ -0,0 +1,84 @@
+# scheduler/search.py
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from .scheduler import Scheduler, TARGET_HOURS
+
+# Wagi składników oceny grafiku (mniej = lepiej)
+DEFAULT_WEIGHTS = {"hours": 1.0, "spread": 2.0, "clustering": 0.5}
+
+COMP_CODES = ("WN", "WS", "WP")
+
+
+def score_schedule(schedule, summary, exclude=(), target_hours=TARGET_HOURS, weights=None):
+    """Ocena grafiku: odchyłka od normy godzin, rozrzut weekendów/świąt i skupianie odbiorów."""
+    w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    # 1. Odchyłka godzin od normy (jak w _adjust_last_day_hours)
+    hours_dev = sum(abs(target_hours - s["hours"]) for s in summary)
+
+    # 2. Rozrzut sobót/niedziel/świąt (tylko osoby, które mogą pracować w weekendy)
+    rows = [s for s in summary if s["employee"] not in exclude]
+    spread = 0
+    if rows:
+        for key in ("saturdays", "sundays", "holidays"):
+            vals = [s[key] for s in rows]
+            spread += max(vals) - min(vals)
+
+    # 3. Skupianie odbiorów: każda para osób z odbiorem tego samego dnia to kara
+    comp_ids = schedule.codes.id_set(COMP_CODES)
+    day_load = (schedule.column_count(di, comp_ids) for di in range(schedule.ndays))
+    clustering = sum(c * (c - 1) // 2 for c in day_load)
+
+    return w["hours"] * hours_dev + w["spread"] * spread + w["clustering"] * clustering
+
+
+# Instancja Schedulera (konfiguracja: SHIFTS, rotacje, próg odpoczynku, zapotrzebowanie) w procesie roboczym
+_worker_scheduler = None
+
+
+def _init_worker(scheduler):
+    global _worker_scheduler
+    _worker_scheduler = scheduler
+
+
+def _run_candidate(job, scheduler=None):
+    (seed, year, month, employees, initial_stats, last_weekend_workers, leaves, last_week_afternoons,
+     optimize_seconds, weights) = job
+    sched = scheduler or _worker_scheduler
+    # Własny generator na seed: wynik jak Scheduler(seed=seed) z tą samą konfiguracją
+    schedule, summary, holidays = sched.generate(year, month, employees, initial_stats, last_weekend_workers, leaves,
+                                                 last_week_afternoons, optimize_seconds, rng=random.Random(seed))
+    exclude = set(sched.special_rotation) | set(sched.special_rotation_2)
+    score = score_schedule(schedule, summary, exclude=exclude, weights=weights)
+    return {"seed": seed, "score": score, "schedule": schedule, "summary": summary, "holidays": holidays}
+
+
+def candidate_seeds(candidates, base_seed=None):
+    """Kolejne seedy od base_seed; bez seeda losujemy bazę, żeby wynik dało się odtworzyć."""
+    if base_seed is None:
+        base_seed = random.SystemRandom().randrange(2**31)
+    return [base_seed + i for i in range(candidates)]
+
+
+def search_candidates(year, month, seeds, workers=None, employees=None, initial_stats=None,
+                      last_weekend_workers=None, leaves=None, last_week_afternoons=None, optimize_seconds=0,
+                      weights=None, scheduler=None):
+    """Generuje po jednym grafiku na seed (w puli procesów) i zwraca (najlepszy, wszystkie).
+
+    Konfiguracja podanej instancji Schedulera trafia do procesów raz, przy starcie puli.
+    """
+    if scheduler is None:
+        scheduler = Scheduler()
+    jobs = [(s, year, month, employees, initial_stats, last_weekend_workers, leaves, last_week_afternoons,
+             optimize_seconds, weights) for s in seeds]
+
+    if workers == 1 or len(jobs) == 1:
+        results = [_run_candidate(j, scheduler) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scheduler,)) as pool:
+            results = list(pool.map(_run_candidate, jobs))
+
+    # Przy remisie wygrywa niższy seed (kolejność jobs)
+    best = min(results, key=lambda r: r["score"])
+    return best, results
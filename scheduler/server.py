@@ -0,0 +1,191 @@
+# scheduler/server.py
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from .batch import BatchJob, run_job
+from .exporters import get_exporter
+from .rules import compile_shift_tables
+from .scheduler import Scheduler
+from .utils import calendar_context
+
+# Pola zadania przejmowane z configu (jak w cli.py), jeśli zadanie ich nie podaje
+CONFIG_FIELDS = ("initial_stats", "last_weekend_workers", "leaves", "last_week_afternoons")
+
+# Ile ostatnich opóźnień trzymamy do percentyli w odpowiedzi na {"cmd": "stats"}
+LATENCY_WINDOW = 1000
+
+
+def warm(scheduler, years, formats=()):
+    """Rozgrzewa cache: kalendarze (święta, Wielkanoc) dla podanych lat, tabele zmian i moduły eksporterów."""
+    for y in years:
+        for m in range(1, 13):
+            calendar_context(y, m)
+    compile_shift_tables(tuple(scheduler.SHIFTS.items()), scheduler.MIN_REST_HOURS)
+    for fmt in formats:
+        get_exporter(fmt)
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ScheduleServer:
+    """Serwer zadań JSON (jedno zadanie na linię) na rozgrzanej instancji Schedulera.
+
+    Zadanie: {"id", "year", "month", "seed", "initial_stats", "last_weekend_workers",
+    "leaves", "last_week_afternoons", "employees", "out", "format"} - brakujące pola
+    danych są brane z configu podanego przy starcie. Z "out" wynik jest zapisywany
+    wybranym eksporterem. Odpowiedź (też jedna linia JSON) niesie "id", "ok",
+    podsumowanie, grafik oraz czasy: "seconds" (generowanie) i "latency"
+    (od przyjęcia do odpowiedzi, razem z czekaniem w kolejce).
+
+    Zadania liczy pula workers wątków; najwyżej queue_size czeka w kolejce, a gdy
+    jest pełna, czytanie kolejnych linii wstrzymuje się (backpressure).
+    """
+
+    def __init__(self, scheduler=None, defaults=None, workers=None, queue_size=16):
+        self.scheduler = scheduler or Scheduler()
+        self.defaults = {k: v for k, v in (defaults or {}).items() if k in CONFIG_FIELDS}
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler-job")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.lock = threading.Lock()
+        self.served = self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    # --- obsługa pojedynczego zadania ---
+    def _job(self, req):
+        missing = [k for k in ("year", "month") if req.get(k) is None]
+        if missing:
+            raise ValueError(f"brak pól: {', '.join(missing)}")
+        data = dict(self.defaults, **{k: req[k] for k in CONFIG_FIELDS if k in req})
+        if data.get("initial_stats") is None or data.get("last_weekend_workers") is None:
+            raise ValueError("brak 'initial_stats' lub 'last_weekend_workers' (ani w zadaniu, ani w configu)")
+        year, month = int(req["year"]), int(req["month"])
+        date(year, month, 1)  # walidacja zakresu miesiąca
+        return BatchJob(req.get("id"), year, month, req.get("seed"), req.get("employees"), data["initial_stats"],
+                        data["last_weekend_workers"], data.get("leaves") or {}, data.get("last_week_afternoons"))
+
+    def handle(self, req, received):
+        """Wykonuje zadanie i zwraca słownik odpowiedzi (błędy też jako odpowiedź)."""
+        resp = {"id": req.get("id") if isinstance(req, dict) else None}
+        try:
+            if not isinstance(req, dict):
+                raise ValueError("zadanie musi być obiektem JSON")
+            job = self._job(req)
+            result = run_job(self.scheduler, job)
+            schedule = result["schedule"]
+            resp.update(ok=True, year=job.year, month=job.month, seed=job.seed, summary=result["summary"],
+                        schedule={e: [schedule.code(ei, di) for di in range(schedule.ndays)]
+                                  for ei, e in enumerate(schedule.employees)},
+                        seconds=round(result["seconds"], 6))
+            if req.get("out"):
+                _, export = get_exporter(req.get("format", "xlsx"))
+                export(self.scheduler, schedule, result["summary"], result["holidays"], job.year, job.month, req["out"])
+                resp["file"] = req["out"]
+        except Exception as e:
+            resp.update(ok=False, error=f"{type(e).__name__}: {e}")
+        resp["latency"] = round(time.perf_counter() - received, 6)
+        with self.lock:
+            self.served += 1
+            self.errors += not resp["ok"]
+            self.latencies.append(resp["latency"])
+        return resp
+
+    def stats(self):
+        with self.lock:
+            lat = list(self.latencies)
+            served, errors = self.served, self.errors
+        return {"ok": True, "served": served, "errors": errors,
+                "latency_mean": sum(lat) / len(lat) if lat else None,
+                "latency_p50": _percentile(lat, 0.5), "latency_p95": _percentile(lat, 0.95),
+                "latency_max": max(lat) if lat else None}
+
+    def submit(self, line, respond):
+        """Przyjmuje jedną linię protokołu; respond(dict) jest wołane z wątku roboczego."""
+        received = time.perf_counter()
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError as e:
+            respond({"id": None, "ok": False, "error": f"niepoprawny JSON: {e}"})
+            return
+        if isinstance(req, dict) and req.get("cmd") == "stats":
+            respond(dict(self.stats(), id=req.get("id")))
+            return
+        # Pełna kolejka blokuje czytanie - klient nie zasypie serwera zadaniami
+        self.slots.acquire()
+        future = self.pool.submit(self.handle, req, received)
+
+        def done(f):
+            self.slots.release()
+            respond(f.result())
+        future.add_done_callback(done)
+
+    # --- transporty ---
+    def serve_lines(self, infile, outfile):
+        """Protokół liniowy na strumieniach (np. stdin/stdout); kończy się z końcem wejścia."""
+        out_lock = threading.Lock()
+
+        def respond(resp):
+            with out_lock:
+                outfile.write(json.dumps(resp, ensure_ascii=False, default=str) + "\n")
+                outfile.flush()
+
+        for line in infile:
+            if line.strip():
+                self.submit(line, respond)
+        # Czekamy na zadania w toku, zanim zamkniemy wyjście
+        self.pool.shutdown(wait=True)
+
+    def serve_unix(self, path):
+        """Ten sam protokół na gnieździe Unix; każde połączenie to osobny strumień linii."""
+        server_ref = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                cond = threading.Condition()
+                pending = 0
+
+                def respond(resp):
+                    nonlocal pending
+                    with cond:
+                        try:
+                            self.wfile.write((json.dumps(resp, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                            self.wfile.flush()
+                        except OSError:
+                            pass  # klient się rozłączył
+                        pending -= 1
+                        cond.notify()
+
+                for raw in self.rfile:
+                    line = raw.decode("utf-8")
+                    if line.strip():
+                        with cond:
+                            pending += 1
+                        server_ref.submit(line, respond)
+                # Połączenie zostaje otwarte, dopóki nie wyślemy wszystkich odpowiedzi
+                with cond:
+                    cond.wait_for(lambda: pending == 0)
+
+        if os.path.exists(path):
+            os.remove(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as srv:
+            srv.daemon_threads = True
+            print(f"Nasłuchiwanie na {path}", file=sys.stderr)
+            try:
+                srv.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(path)
+                self.pool.shutdown(wait=True)
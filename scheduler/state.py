@@ -0,0 +1,75 @@
+# scheduler/state.py
+import json
+import os
+from datetime import date, timedelta
+
+from .utils import HOLIDAY, SATURDAY, SUNDAY
+
+CATEGORIES = (SATURDAY, SUNDAY, HOLIDAY)
+
+# Klucze rotacji popołudniowych (tak jak "last_week_afternoons" w configu)
+AFTERNOON_CODES = {"12-20": "12.00-20.00", "14-22": "14.00-22.00", "13-21": "13.00-21.00"}
+
+
+def default_stats():
+    return {"saturdays": 0, "sundays": 0, "holidays": 0}
+
+
+class ScheduleState:
+    """Stan przenoszony między miesiącami: statystyki, daty ostatnich dyżurów,
+    pozycje rotacji popołudniowych i zmiany z ostatniego dnia miesiąca.
+
+    ``month`` to ostatni wygenerowany miesiąc ("YYYY-MM") albo None dla stanu startowego.
+    """
+
+    def __init__(self, stats=None, last_days=None, afternoons=None, last_shifts=None, month=None):
+        self.stats = stats or {}
+        self.last_days = {c: dict((last_days or {}).get(c, {})) for c in CATEGORIES}
+        self.afternoons = dict(afternoons or {})
+        self.last_shifts = dict(last_shifts or {})
+        self.month = month
+
+    @classmethod
+    def initial(cls, first_day, initial_stats=None, last_weekend_workers=None, last_week_afternoons=None):
+        """Stan z danych configu (initial_stats, last_weekend_workers, last_week_afternoons)."""
+        stats = {e: s.copy() for e, s in (initial_stats or {}).items()}
+        # Osoby z ostatniego weekendu dostają niedzielę dzień przed miesiącem,
+        # co blokuje je w niedzielach na 21 dni od tej daty
+        last_sunday = first_day - timedelta(days=1)
+        last_days = {SUNDAY: {e: last_sunday for e in (last_weekend_workers or [])}}
+        return cls(stats, last_days, last_week_afternoons)
+
+    def stats_for(self, e):
+        return self.stats[e].copy() if e in self.stats else default_stats()
+
+    def last_day(self, category, e, default):
+        return self.last_days[category].get(e, default)
+
+    # --- zapis / odczyt (checkpoint) ---
+    def to_dict(self):
+        return {
+            "month": self.month,
+            "stats": self.stats,
+            "last_days": {c: {e: d.isoformat() for e, d in days.items()} for c, days in self.last_days.items()},
+            "last_week_afternoons": self.afternoons,
+            "last_shifts": self.last_shifts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        last_days = {c: {e: date.fromisoformat(d) for e, d in days.items()}
+                     for c, days in data.get("last_days", {}).items()}
+        return cls(data.get("stats"), last_days, data.get("last_week_afternoons"),
+                   data.get("last_shifts"), data.get("month"))
+
+    def save(self, path):
+        # Zapis atomowy: przerwany zapis nie niszczy poprzedniego checkpointu
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -1,11 +1,13 @@
 # scheduler/utils.py
 import calendar
 from datetime import date, timedelta
+from functools import lru_cache
 
 def month_days(year, month):
     _, ndays = calendar.monthrange(year, month)
     return [date(year, month, d) for d in range(1, ndays+1)]
 
+@lru_cache(maxsize=None)
 def easter_date(year):
     a = year % 19
     b = year // 100
@@ -23,10 +25,77 @@ def easter_date(year):
     day = ((h + l - 7*m + 114) % 31) + 1
     return date(year, month, day)
 
-def polish_holidays(year):
+@lru_cache(maxsize=None)
+def _holidays_for(year, easter):
     fixed = [(1,1),(1,6),(5,1),(5,3),(8,15),(11,1),(11,11),(12,25),(12,26)]
     hol = set(date(year,m,d) for (m,d) in fixed)
-    e = easter_date(year)
-    hol.add(e + timedelta(days=1)) # Easter Monday
-    hol.add(e + timedelta(days=60)) # Corpus Christi (approx)
-    return hol
+    hol.add(easter + timedelta(days=1)) # Easter Monday
+    hol.add(easter + timedelta(days=60)) # Corpus Christi (approx)
+    return frozenset(hol)
+
+def polish_holidays(year):
+    # Cache na poziomie roku, kluczem jest data Wielkanocy (od niej zależą święta ruchome)
+    return _holidays_for(year, easter_date(year))
+
+def week_monday(d):
+    # Poniedziałek tygodnia kalendarzowego z dniem d (wspólny dla obu miesięcy na przełomie)
+    return d - timedelta(days=d.weekday())
+
+def counted_week(monday):
+    # Czy tydzień od danego poniedziałku trafia do liczników rotacji (CalendarContext.counted_weeks)
+    thursday = monday + timedelta(days=3)
+    ctx = calendar_context(thursday.year, thursday.month)
+    return ctx.week_of[ctx.day_index[thursday]] in ctx.counted_weeks
+
+def week_index(d):
+    # Numer tygodnia w miesiącu liczony od poniedziałku tygodnia z 1. dniem miesiąca
+    first = d.replace(day=1)
+    first_monday = first - timedelta(days=first.weekday())
+    return (d - first_monday).days // 7
+
+WORKDAY, SATURDAY, SUNDAY, HOLIDAY = "workday", "saturday", "sunday", "holiday"
+
+class CalendarContext:
+    """Niezmienny, wyliczony raz kalendarz miesiąca (święta, klasy dni, tygodnie).
+
+    Wszystkie tablice są indeksowane numerem dnia w miesiącu liczonym od 0.
+    """
+
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.days = tuple(month_days(year, month))
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.holidays = polish_holidays(year)
+        self.month_holidays = frozenset(d for d in self.days if d in self.holidays)
+
+        self.weekday = tuple(d.weekday() for d in self.days)
+        self.is_holiday = tuple(d in self.holidays for d in self.days)
+        self.is_workday = tuple(wd < 5 and not h for wd, h in zip(self.weekday, self.is_holiday))
+        # Święto ma pierwszeństwo przed sobotą/niedzielą
+        self.day_class = tuple(
+            HOLIDAY if h else (SATURDAY if wd == 5 else (SUNDAY if wd == 6 else WORKDAY))
+            for wd, h in zip(self.weekday, self.is_holiday)
+        )
+        self.workday_idx = tuple(i for i, c in enumerate(self.day_class) if c == WORKDAY)
+        self.saturday_idx = tuple(i for i, c in enumerate(self.day_class) if c == SATURDAY)
+        self.sunday_idx = tuple(i for i, c in enumerate(self.day_class) if c == SUNDAY)
+        self.holiday_idx = tuple(i for i, c in enumerate(self.day_class) if c == HOLIDAY)
+        self.duty_idx = tuple(i for i, c in enumerate(self.day_class) if c != WORKDAY)
+
+        # Tygodnie: indeks tygodnia dnia, posortowane tygodnie i numer tygodnia w miesiącu (od 1)
+        self.week_of = tuple(week_index(d) for d in self.days)
+        self.weeks = tuple(sorted(set(self.week_of)))
+        pos = {w: n for n, w in enumerate(self.weeks, 1)}
+        self.nth_week = tuple(pos[w] for w in self.week_of)
+        self.even_week = tuple(n % 2 == 0 for n in self.nth_week)
+        self.days_by_week = {w: tuple(i for i, x in enumerate(self.week_of) if x == w) for w in self.weeks}
+        # Tygodnie zaliczane temu miesiącowi w licznikach rotacji: tydzień na przełomie miesięcy
+        # liczy się raz, w miesiącu z jego czwartkiem (jak tydzień ISO), i tylko z dniem roboczym
+        self.counted_weeks = tuple(w for w in self.weeks
+                                   if any(self.weekday[di] == 3 for di in self.days_by_week[w])
+                                   and any(self.is_workday[di] for di in self.days_by_week[w]))
+
+@lru_cache(maxsize=256)
+def calendar_context(year, month):
+    return CalendarContext(year, month)
@@ -0,0 +1,172 @@
+# scheduler/validate.py
+import json
+from collections import Counter, namedtuple
+from datetime import date
+from itertools import repeat
+from operator import add, mul
+
+from .matrix import ScheduleMatrix
+from .utils import calendar_context, HOLIDAY, SATURDAY, SUNDAY
+from .weekend import LIMITS
+
+# Jedno naruszenie: reguła, waga ("error" - twarda zasada, "warning" - cel miękki),
+# pracownik, dzień (date albo None dla całego miesiąca) i opis
+Violation = namedtuple("Violation", "rule severity employee day detail")
+
+RULES = {
+    "rest": "error",                   # odpoczynek między zmianami (Scheduler.rest_ok)
+    "sunday_after_saturday": "error",  # niedziela po pracującej sobocie (_assign_weekend_day)
+    "forbidden_duty": "error",         # grupa rotacji specjalnych na dyżurze weekendowym/świątecznym
+    "spacing": "warning",              # odstęp między dyżurami tej samej kategorii (LIMITS)
+    "hours": "warning",                # odchyłka od miesięcznej normy godzin
+}
+
+
+def _v(rule, employee, day, detail):
+    return Violation(rule, RULES[rule], employee, day, detail)
+
+
+class Validator:
+    """Sprawdza grafiki (ScheduleMatrix) całymi tablicami zamiast komórka po komórce.
+
+    Przejścia między dniami są sprawdzane jednym przebiegiem po całej macierzy:
+    pary (wczoraj, dziś) zamieniane są na indeksy tabeli RestTable, a wynik to
+    maska bajtów, w której szukamy zer. Pozostałe reguły czytają kolumny dni
+    weekendowych jako wycinki tablicy godzin.
+    """
+
+    def __init__(self, scheduler, target_hours=None):
+        # Import lokalny: scheduler.py sam używa walidatora jako kontroli po generowaniu
+        from .scheduler import TARGET_HOURS
+        self.codes, self.rest = scheduler.shift_tables
+        self.forbidden = frozenset(scheduler.special_rotation) | frozenset(scheduler.special_rotation_2)
+        self.target_hours = TARGET_HOURS if target_hours is None else target_hours
+
+    def _rest(self, m, before, out):
+        nd, n = m.ndays, self.rest.n
+        ids, allowed = m.ids, self.rest.allowed[1]
+        codes = m.codes.codes
+        # Maska dla wszystkich par sąsiednich komórek naraz; pary na granicy wierszy pomijamy
+        mask = bytes(map(allowed.__getitem__, map(add, map(mul, ids[:-1], repeat(n)), ids[1:])))
+        pos = mask.find(0)
+        while pos != -1:
+            ei, di = divmod(pos, nd)
+            if di + 1 < nd:
+                out.append(_v("rest", m.employees[ei], m.days[di + 1],
+                              f"{codes[ids[pos]]} -> {codes[ids[pos + 1]]} (< {self.rest.min_rest} h)"))
+            pos = mask.find(0, pos + 1)
+        # Przejście z ostatniego dnia poprzedniego miesiąca, jeśli jest znane
+        for ei, prev in enumerate(before):
+            if prev is not None and not allowed[prev * n + ids[ei * nd]]:
+                out.append(_v("rest", m.employees[ei], m.days[0],
+                              f"{codes[prev]} -> {codes[ids[ei * nd]]} (< {self.rest.min_rest} h)"))
+
+    def _sunday_after_saturday(self, m, ctx, before, out):
+        nd, hours = m.ndays, m.hours
+        for di in (i for i, wd in enumerate(ctx.weekday) if wd == 6):
+            sun = hours[di::nd]
+            if di > 0:
+                sat = hours[di - 1::nd]
+            else:
+                sat = [prev is not None and m.codes.hours[prev] for prev in before]
+            for ei, (s, p) in enumerate(zip(sun, sat)):
+                if s and p:
+                    out.append(_v("sunday_after_saturday", m.employees[ei], m.days[di], "pracująca sobota i niedziela"))
+
+    def _forbidden(self, m, ctx, out):
+        nd, hours = m.ndays, m.hours
+        rows = [ei for ei, e in enumerate(m.employees) if e in self.forbidden]
+        for di in ctx.duty_idx:
+            col = hours[di::nd]
+            for ei in rows:
+                if col[ei]:
+                    out.append(_v("forbidden_duty", m.employees[ei], m.days[di], f"{ctx.day_class[di]}: {m.code(ei, di)}"))
+
+    def _spacing(self, m, ctx, last_days, out):
+        nd, hours = m.ndays, m.hours
+        for cat, idx in ((SATURDAY, ctx.saturday_idx), (SUNDAY, ctx.sunday_idx), (HOLIDAY, ctx.holiday_idx)):
+            last = last_days.setdefault(cat, {})
+            limit = LIMITS[cat]
+            for di in idx:
+                d = m.days[di]
+                for ei, h in enumerate(hours[di::nd]):
+                    if not h:
+                        continue
+                    e = m.employees[ei]
+                    prev = last.get(e)
+                    if prev is not None and (d - prev).days < limit:
+                        out.append(_v("spacing", e, d, f"{cat}: {(d - prev).days} dni od {prev} (min. {limit})"))
+                    last[e] = d
+
+    def _hours(self, m, out):
+        for ei, e in enumerate(m.employees):
+            h = m.row_hours(ei)
+            if h != self.target_hours:
+                out.append(_v("hours", e, None, f"{h} h (norma {self.target_hours} h)"))
+
+    def check(self, schedule, state=None, last_days=None, before=None):
+        """Lista naruszeń jednego miesiąca. last_days ({kategoria: {pracownik: data}})
+        jest uzupełniany w miejscu, co pozwala łączyć kolejne miesiące w audycie;
+        domyślnie startuje z dat ostatnich dyżurów ze stanu. before to id zmian
+        z dnia przed miesiącem (domyślnie schedule.before)."""
+        if last_days is None:
+            last_days = {c: dict(days) for c, days in state.last_days.items()} if state else {}
+        if schedule.codes.codes != self.codes.codes:
+            raise ValueError("grafik używa innego katalogu zmian niż walidator")
+        ctx = calendar_context(schedule.days[0].year, schedule.days[0].month)
+        if before is None:
+            before = schedule.before
+        out = []
+        self._rest(schedule, before, out)
+        self._sunday_after_saturday(schedule, ctx, before, out)
+        self._forbidden(schedule, ctx, out)
+        self._spacing(schedule, ctx, last_days, out)
+        self._hours(schedule, out)
+        return out
+
+    def audit(self, schedules, state=None):
+        """Audyt kolejnych miesięcy (chronologicznie): odstępy dyżurów i odpoczynek na
+        granicy miesięcy liczone są ciągle. Zwraca raport gotowy do zapisu jako JSON."""
+        last_days = {c: dict(days) for c, days in state.last_days.items()} if state else {}
+        prev = None
+        months, cells = [], 0
+        violations = []
+        for m in schedules:
+            # Zmiany z ostatniego dnia poprzedniego miesiąca archiwum
+            before = None
+            if prev is not None and all(b is None for b in m.before):
+                last_col = {e: prev.get_id(ei, prev.ndays - 1) for ei, e in enumerate(prev.employees)}
+                before = [last_col.get(e) for e in m.employees]
+            found = self.check(m, last_days=last_days, before=before)
+            months.append({"month": f"{m.days[0]:%Y-%m}", "employees": len(m.employees), "violations": len(found)})
+            violations += found
+            cells += len(m.ids)
+            prev = m
+        return report_dict(violations, months=months, cells=cells)
+
+
+def report_dict(violations, **extra):
+    """Raport JSON: liczniki na regułę i wagę oraz lista naruszeń."""
+    return dict(extra,
+                counts=dict(Counter(v.rule for v in violations)),
+                errors=sum(v.severity == "error" for v in violations),
+                warnings=sum(v.severity == "warning" for v in violations),
+                violations=[{"rule": v.rule, "severity": v.severity, "employee": v.employee,
+                             "day": v.day.isoformat() if v.day else None, "detail": v.detail}
+                            for v in violations])
+
+
+def load_jsonl(path, codes):
+    """Grafik z pliku eksportu jsonl (linia na pracownika, "shifts": {data: kod})."""
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        raise ValueError(f"pusty plik: {path}")
+    ctx = calendar_context(rows[0]["year"], rows[0]["month"])
+    m = ScheduleMatrix([r["employee"] for r in rows], ctx.days, codes)
+    for ei, r in enumerate(rows):
+        for d, code in r["shifts"].items():
+            if code not in codes.ids:
+                raise ValueError(f"{path}: nieznany kod zmiany {code!r} ({r['employee']}, {d})")
+            m.set(ei, m.day_index[date.fromisoformat(d)], code)
+    return m
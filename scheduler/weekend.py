@@ -0,0 +1,82 @@
+# scheduler/weekend.py
+import heapq
+
+from .utils import HOLIDAY, SATURDAY, SUNDAY
+
+# Minimalny odstęp (w dniach) między dyżurami tej samej kategorii
+LIMITS = {HOLIDAY: 10, SUNDAY: 21, SATURDAY: 12}
+
+# Kategoria -> klucz w słowniku statystyk
+STAT_KEYS = {HOLIDAY: "holidays", SUNDAY: "sundays", SATURDAY: "saturdays"}
+
+
+class WeekendAllocator:
+    """Kolejki priorytetowe kandydatów do dyżurów, osobno dla sobót, niedziel i świąt.
+
+    Dla każdej kategorii trzymamy dwa kopce:
+
+    * ``ready`` - osoby, które odpoczywały co najmniej ``LIMITS[kat]`` dni,
+      kolejność ``(liczba dyżurów, data ostatniego dyżuru, pozycja)``;
+    * ``waiting`` - osoby w okresie odpoczynku (kolejka ratunkowa),
+      kolejność ``(data ostatniego dyżuru, liczba dyżurów, pozycja)``.
+
+    Dni przetwarzamy rosnąco, więc osoby przechodzą z ``waiting`` do ``ready``
+    w kolejności dat. Wybór k osób kosztuje O(k log n) plus pominięte osoby
+    niedostępne danego dnia. ``stats`` i ``last_days`` są aktualizowane w miejscu.
+    """
+
+    def __init__(self, employees, candidates, stats, last_days):
+        # candidates: indeksy pracowników, którzy w ogóle mogą mieć dyżur (bez grup zakazanych)
+        self.employees = employees
+        self.stats = stats
+        self.last_days = last_days
+        self.ready = {}
+        self.waiting = {}
+        # Liczba ocenionych (zdjętych z kopców) kandydatów - licznik dla profilera
+        self.scored = 0
+        for cat, limit in LIMITS.items():
+            key = STAT_KEYS[cat]
+            last = last_days[cat]
+            self.ready[cat] = []
+            self.waiting[cat] = [
+                (last[employees[ei]].toordinal(), stats[employees[ei]][key], ei) for ei in candidates
+            ]
+            heapq.heapify(self.waiting[cat])
+
+    def _release(self, cat, day_ord):
+        # Przenosimy do "ready" osoby, których odpoczynek minął
+        waiting, ready = self.waiting[cat], self.ready[cat]
+        bound = day_ord - LIMITS[cat]
+        while waiting and waiting[0][0] <= bound:
+            last, count, ei = heapq.heappop(waiting)
+            heapq.heappush(ready, (count, last, ei))
+
+    def pick(self, cat, d, k, eligible):
+        """Zwraca do k indeksów pracowników dla dnia d, dla których eligible(ei) jest prawdziwe."""
+        day_ord = d.toordinal()
+        self._release(cat, day_ord)
+
+        picked = []
+        for heap in (self.ready[cat], self.waiting[cat]):
+            skipped = []
+            while heap and len(picked) < k:
+                entry = heapq.heappop(heap)
+                self.scored += 1
+                if eligible(entry[-1]):
+                    picked.append(entry[-1])
+                else:
+                    skipped.append(entry)
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+
+        for ei in picked:
+            self._record(cat, ei, d)
+        return picked
+
+    def _record(self, cat, ei, d):
+        e = self.employees[ei]
+        key = STAT_KEYS[cat]
+        self.stats[e][key] += 1
+        self.last_days[cat][e] = d
+        # Świeżo wybrana osoba zawsze trafia do kolejki odpoczynku
+        heapq.heappush(self.waiting[cat], (d.toordinal(), self.stats[e][key], ei))
@@ -0,0 +1,111 @@
+# scheduler/xlsx.py
+import calendar
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+ODBIOR_CODES = ("WN", "WS", "WP", "WH", "WW")
+ZERO_HOUR_CODES = ("WN", "WS", "WP", "WH", "OFF")
+
+
+class XlsxWriter:
+    """Strumieniowy zapis grafików do jednego pliku .xlsx (tryb write-only openpyxl).
+
+    Style są rejestrowane raz jako style nazwane, a wiersze trafiają do arkusza
+    po kolei, więc pamięć nie rośnie z liczbą arkuszy. Każde wywołanie
+    ``add_month`` dodaje osobny arkusz (np. kolejny miesiąc albo zespół).
+    """
+
+    def __init__(self, filename, shifts, colors):
+        self.filename = filename
+        self.shifts = shifts
+        self.wb = Workbook(write_only=True)
+        self._register_styles(colors)
+
+    def _register_styles(self, colors):
+        side = Side(style="thin")
+        border = Border(left=side, right=side, top=side, bottom=side)
+        center = Alignment(horizontal="center", vertical="center")
+        bold = Font(bold=True)
+        fills = {
+            "sat": PatternFill("solid", fgColor=colors["saturday"]),
+            "sun": PatternFill("solid", fgColor=colors["sunday"]),
+            "hol": PatternFill("solid", fgColor=colors["holiday"]),
+            "odb": PatternFill("solid", fgColor=colors["odbior"]),
+        }
+
+        def add(name, **kw):
+            self.wb.add_named_style(NamedStyle(name=name, **kw))
+
+        add("harm_bold", font=bold)
+        add("harm_cell", alignment=center, border=border)
+        for key, fill in fills.items():
+            add(f"harm_head_{key}", font=bold, fill=fill)
+            add(f"harm_cell_{key}", alignment=center, border=border, fill=fill)
+
+    def _cell(self, ws, value, style=None):
+        c = WriteOnlyCell(ws, value)
+        if style:
+            c.style = style
+        return c
+
+    def add_month(self, schedule, summary, holidays, days, year, month, title=None):
+        ws = self.wb.create_sheet(title or f"{calendar.month_name[month]}_{year}")
+
+        # Szerokości kolumn muszą być ustawione przed pierwszym wierszem
+        ws.column_dimensions["A"].width = 10.72  # Pracownik (trochę szerszy)
+        ws.column_dimensions["B"].width = 10.5  # Typ danych
+        for i in range(len(days)):
+            ws.column_dimensions[get_column_letter(3 + i)].width = 10.3
+
+        # Klasa dnia -> sufiks stylu (święto ma pierwszeństwo)
+        day_key = [("hol" if d in holidays else ("sat" if d.weekday() == 5 else ("sun" if d.weekday() == 6 else None)))
+                   for d in days]
+
+        head = [self._cell(ws, "Pracownik", "harm_bold"), self._cell(ws, "Typ danych", "harm_bold")]
+        names = [None, None]
+        for d, key in zip(days, day_key):
+            style = f"harm_head_{key}" if key else "harm_bold"
+            head.append(self._cell(ws, d.day, style))
+            names.append(self._cell(ws, calendar.day_name[d.weekday()][:2], style))
+        ws.append(head)
+        ws.append(names)
+
+        for e in schedule:
+            shifts = schedule[e]
+            codes = [self._cell(ws, e, "harm_bold"), "Godziny"]
+            hours = [None, "Liczba h"]
+            for d, key in zip(days, day_key):
+                val = shifts[d]
+                if val in ODBIOR_CODES:
+                    style = "harm_cell_odb"
+                else:
+                    style = f"harm_cell_{key}" if key else "harm_cell"
+                codes.append(self._cell(ws, val, style))
+                h_val = self.shifts.get(val, (0, 0, 0))[2] if val not in ZERO_HOUR_CODES else 0
+                hours.append(self._cell(ws, h_val, "harm_cell"))
+            ws.append(codes)
+            ws.append(hours)
+
+        ws.append([])
+        ws.append([self._cell(ws, "PODSUMOWANIE", "harm_bold")])
+        ws.append([self._cell(ws, t, "harm_bold") for t in ("Pracownik", "Suma h", "Soboty", "Niedziele", "Święta")])
+        for s in summary:
+            ws.append([s["employee"], s["hours"], s["saturdays"], s["sundays"], s["holidays"]])
+
+    def close(self):
+        self.wb.save(self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def export(scheduler, schedule, summary, holidays, year, month, filename):
+    with XlsxWriter(filename, scheduler.SHIFTS, scheduler.COLORS) as writer:
+        writer.add_month(schedule, summary, holidays, schedule.days, year, month)
@@ -0,0 +1,18 @@
+from scheduler import cache
+
+
+def test_version_is_part_of_key(monkeypatch):
+    parts = dict(year=2026, month=5, seed=1)
+    key = cache.result_key(**parts)
+    assert cache.result_key(**parts) == key
+    monkeypatch.setattr(cache, "SCHEDULER_VERSION", cache.SCHEDULER_VERSION + 1)
+    assert cache.result_key(**parts) != key
+
+
+def test_cached_entry_from_older_version_is_missed(tmp_path, monkeypatch):
+    store = cache.ResultCache(str(tmp_path))
+    key = cache.result_key(year=2026, month=5)
+    store.put(key, {"result": "old"})
+    monkeypatch.setattr(cache, "SCHEDULER_VERSION", cache.SCHEDULER_VERSION + 1)
+    assert store.get(cache.result_key(year=2026, month=5)) is None
+    assert store.get(key) == {"result": "old"}
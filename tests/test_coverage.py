@@ -0,0 +1,23 @@
+import random
+from datetime import date
+
+from scheduler.coverage import Coverage, parse_demand
+from scheduler.matrix import ScheduleMatrix
+from scheduler.scheduler import Scheduler
+from scheduler.utils import calendar_context
+
+
+def test_comp_day_fixes_rest_before_coverage():
+    # Piątek 14-22 przed sobotnim dyżurem 08-17 łamie odpoczynek; zapotrzebowanie woli
+    # popołudnia, ale odbiór i tak zabiera ten piątek
+    s = Scheduler(seed=1)
+    ctx = calendar_context(2026, 6)
+    m = ScheduleMatrix(["A"], ctx.days, s.shift_tables[0])
+    for di in ctx.workday_idx:
+        m.set(0, di, "07.00-15.00")
+    friday, saturday = ctx.day_index[date(2026, 6, 12)], ctx.day_index[date(2026, 6, 13)]
+    m.set(0, friday, "14.00-22.00")
+    m.set(0, saturday, "08.00-17.00")
+    coverage = Coverage(m, s.coverage_table, parse_demand({"workday": {"14-22": 5}})).attach()
+    s._assign_compensatory(ctx, m, {}, random.Random(1), coverage)
+    assert m.code(0, friday) == "WP"
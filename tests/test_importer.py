@@ -0,0 +1,64 @@
+import random
+from datetime import date
+
+from scheduler.importer import rebuild_state
+from scheduler.matrix import ScheduleMatrix
+from scheduler.scheduler import Scheduler
+from scheduler.state import ScheduleState
+from scheduler.utils import calendar_context
+
+
+def _blank(year, month, employees, fill="07.00-15.00"):
+    codes, _ = Scheduler().shift_tables
+    ctx = calendar_context(year, month)
+    m = ScheduleMatrix(employees, ctx.days, codes)
+    for ei in range(len(employees)):
+        for di in ctx.workday_idx:
+            m.set(ei, di, fill)
+    return m
+
+
+def test_matches_chained_state():
+    s = Scheduler(seed=7)
+    state = ScheduleState.initial(date(2026, 1, 1))
+    rng = random.Random(7)
+    schedules = []
+    for month in range(1, 7):
+        schedule, _, _, state = s.generate_month(2026, month, state, rng=rng)
+        schedules.append(schedule)
+    rebuilt = rebuild_state(schedules, rest=s.rest_table)
+    assert rebuilt.afternoons == state.afternoons
+    for e, st in state.stats.items():
+        for key in ("saturdays", "sundays", "holidays", "weeks_12_20", "weeks_14_22"):
+            assert rebuilt.stats[e].get(key, 0) == st.get(key, 0), (e, key)
+
+
+def test_empty_sheet_is_skipped():
+    codes, _ = Scheduler().shift_tables
+    empty = ScheduleMatrix([], calendar_context(2026, 2).days, codes)
+    assert rebuild_state([empty]).month is None
+    full = _blank(2026, 1, ["A", "B"])
+    assert rebuild_state([full, empty]).month == "2026-01"
+
+
+def test_afternoon_forced_by_duty_is_not_rotation():
+    # 2026-06-07 to niedziela: A ma dyżur 14-22 i cały tydzień wymuszone 14-22 (ukryte 12-20),
+    # B po dyżurze 08-17 może przyjść na 12-20, więc to jego rotacja
+    m = _blank(2026, 6, ["A", "B", "C"])
+    ctx = calendar_context(2026, 6)
+    a, b, _ = range(3)
+    sunday = ctx.day_index[date(2026, 6, 7)]
+    m.set(a, sunday, "14.00-22.00")
+    week = [di for di in ctx.days_by_week[ctx.week_of[sunday] + 1] if ctx.is_workday[di]]
+    for di in week:
+        m.set(a, di, "14.00-22.00")
+    state = rebuild_state([m])
+    assert state.stats["A"]["weeks_14_22"] == 0
+    assert state.stats["A"]["weeks_12_20"] == 1
+
+    m.set(b, sunday, "08.00-17.00")
+    for di in week:
+        m.set(b, di, "12.00-20.00")
+    state = rebuild_state([m])
+    assert state.stats["A"]["weeks_12_20"] == 0
+    assert state.stats["B"]["weeks_12_20"] == 1
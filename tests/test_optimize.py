@@ -0,0 +1,57 @@
+import random
+from datetime import date, timedelta
+
+from scheduler.optimize import COMP_CODES, COMP_WINDOW, EARNING_CODES, LocalSearch
+from scheduler.scheduler import Scheduler
+from scheduler.state import ScheduleState
+from scheduler.utils import SATURDAY, calendar_context
+
+
+def _chain(seed, months, seconds=0.2):
+    s = Scheduler(seed=seed)
+    state = ScheduleState.initial(date(2026, months[0], 1))
+    rng = random.Random(seed)
+    out = []
+    for month in months:
+        report = {}
+        schedule, _, _, state = s.generate_month(2026, month, state, optimize_seconds=seconds, report=report,
+                                                 rng=rng)
+        out.append((schedule, report))
+    return out
+
+
+def test_duty_spacing_holds_across_months():
+    for schedule, report in _chain(3, (1, 2, 3, 4)):
+        assert report["validation"]["counts"].get("spacing", 0) == 0, schedule.days[0]
+
+
+def test_transfer_respects_previous_month_duty():
+    s = Scheduler(seed=1)
+    ctx = calendar_context(2026, 3)
+    state = ScheduleState.initial(date(2026, 3, 1))
+    schedule, _, _, _ = s.generate_month(2026, 3, state, rng=random.Random(1))
+    saturday = ctx.saturday_idx[0]
+    off = schedule.codes.ids["OFF"]
+    special = set(s.special_rotation) | set(s.special_rotation_2)
+    # Ktoś wolny w pierwszą sobotę i w niedzielę po niej
+    ei = next(ei for ei, e in enumerate(schedule.employees)
+              if e not in special and schedule.get_id(ei, saturday) == off
+              and not schedule.hours[ei * schedule.ndays + saturday + 1])
+    e = schedule.employees[ei]
+    base = {x: state.stats_for(x) for x in schedule.employees}
+    free = LocalSearch(ctx, schedule, base, s.rest_table)
+    recent = LocalSearch(ctx, schedule, base, s.rest_table,
+                         last_days={SATURDAY: {e: ctx.days[saturday] - timedelta(days=7)}})
+    assert free._duty_allowed(ei, saturday)
+    assert not recent._duty_allowed(ei, saturday)
+
+
+def test_comps_stay_with_their_duties():
+    for schedule, _ in _chain(2, (4, 5)):
+        ctx = calendar_context(2026, schedule.days[0].month)
+        for ei in range(len(schedule.employees)):
+            row = [schedule.code(ei, di) for di in range(schedule.ndays)]
+            duties = [di for di in ctx.duty_idx if row[di] in EARNING_CODES]
+            comps = [di for di, c in enumerate(row) if c in COMP_CODES]
+            assert len(comps) <= len(duties)
+            assert all(any(abs(c - d) <= COMP_WINDOW for d in duties) for c in comps)
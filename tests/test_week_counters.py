@@ -0,0 +1,46 @@
+import random
+from datetime import date, timedelta
+
+from scheduler.ledger import Ledger
+from scheduler.scheduler import Scheduler
+from scheduler.state import ScheduleState
+from scheduler.utils import calendar_context, week_monday
+
+COUNTERS = ("weeks_12_20", "weeks_14_22")
+
+
+def test_split_weeks_counted_once():
+    mondays = []
+    for month in range(1, 13):
+        ctx = calendar_context(2026, month)
+        mondays += [week_monday(ctx.days[ctx.days_by_week[w][0]]) for w in ctx.counted_weeks]
+    assert len(mondays) == len(set(mondays))
+    # Każdy tydzień roku z dniem roboczym (poza przełomem lat) jest zaliczony
+    first, last = date(2026, 1, 5), date(2026, 12, 28)
+    assert set(mondays) >= {first + timedelta(weeks=k) for k in range((last - first).days // 7 + 1)}
+
+
+def test_february_2026_skips_week_without_workdays():
+    # 1 lutego 2026 to niedziela - tydzień należy do stycznia
+    ctx = calendar_context(2026, 2)
+    assert ctx.weeks[0] not in ctx.counted_weeks
+    assert len(ctx.counted_weeks) == 4
+
+
+def test_generator_and_ledger_agree(tmp_path):
+    s = Scheduler(seed=3)
+    ledger = Ledger(str(tmp_path / "ledger.db"))
+    state = ScheduleState.initial(date(2026, 1, 1))
+    rng = random.Random(3)
+    for month in (1, 2, 3, 4):
+        _, _, _, state = s.generate_month(2026, month, state, rng=rng, ledger=ledger)
+        # 12-20 i 14-22 mają po jednej osobie w każdym zaliczonym tygodniu
+        for key in COUNTERS:
+            assert sum(st.get(key, 0) for st in state.stats.values()) == \
+                sum(len(calendar_context(2026, mo).counted_weeks) for mo in range(1, month + 1))
+    from_ledger = ledger.state(date(2026, 5, 1))
+    ledger.close()
+    for e, st in state.stats.items():
+        for key in COUNTERS:
+            assert from_ledger.stats[e].get(key, 0) == st.get(key, 0), (e, key)
+    assert from_ledger.afternoons == state.afternoons
@@ -0,0 +1,39 @@
+import random
+from datetime import date
+
+import pytest
+
+from scheduler.scheduler import Scheduler
+from scheduler.state import AFTERNOON_CODES, ScheduleState
+from scheduler.utils import calendar_context
+
+
+def _holders(week_pref):
+    return {code: e for e, code in week_pref.items() if code in AFTERNOON_CODES.values()}
+
+
+def _chain(year, month, seed=1):
+    """Preferencje ostatniego tygodnia miesiąca i pierwszego tygodnia następnego (stan przez generate_month)."""
+    s = Scheduler(seed=seed)
+    ctx = calendar_context(year, month)
+    state = ScheduleState.initial(date(year, month, 1))
+    pref = s._make_weekly_pref(ctx, s.employees, random.Random(seed))
+    _, _, _, next_state = s.generate_month(year, month, state, rng=random.Random(seed), weekly_pref=pref)
+    nyear, nmonth = (year + 1, 1) if month == 12 else (year, month + 1)
+    nctx = calendar_context(nyear, nmonth)
+    npref = s._make_weekly_pref(nctx, s.employees, random.Random(seed + 1), next_state.afternoons)
+    return pref[ctx.weeks[-1]], npref[nctx.weeks[0]], npref[nctx.weeks[1]]
+
+
+@pytest.mark.parametrize("year,month", [(2026, 3), (2026, 6), (2026, 8), (2026, 11), (2026, 1)])
+def test_shared_week_keeps_previous_holders(year, month):
+    # Kwiecień i lipiec 2026 zaczynają się w środę, wrzesień i grudzień we wtorek, luty w niedzielę
+    last, first, second = _chain(year, month)
+    assert _holders(first) == _holders(last)
+    assert set(_holders(second).values()).isdisjoint(_holders(last).values())
+
+
+def test_month_starting_on_monday_moves_rotation_on():
+    # 1 czerwca 2026 to poniedziałek - tydzień nie jest wspólny z majem
+    last, first, _ = _chain(2026, 5)
+    assert set(_holders(first).values()).isdisjoint(_holders(last).values())